@@ -0,0 +1,97 @@
+"""
+Latency and memory of each classifier artifact against the fp32 eager model.
+
+    python manage.py export_classifier --untrained --output-dir /tmp/classifier
+    python benchmarks/bench_classifier_variants.py --artifact-dir /tmp/classifier
+
+Every variant is measured in a fresh interpreter, so the RSS figures are what
+one worker pays for the model on top of Django and torch.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'craftify.settings')
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(variant, artifact_dir, iterations, batch_size, threads):
+    import django
+    django.setup()
+    import torch
+    from django.conf import settings
+    from craftify import ml_utils
+
+    torch.set_num_threads(threads)
+    settings.CLASSIFIER_ARTIFACT_DIR = artifact_dir
+    before = rss_mb()
+    if variant == 'eager':
+        model = ml_utils.build_model().eval()
+    else:
+        model = ml_utils.load_model(variant)
+    single = torch.rand(1, 3, ml_utils.INPUT_SIZE, ml_utils.INPUT_SIZE)
+    batch = torch.rand(batch_size, 3, ml_utils.INPUT_SIZE, ml_utils.INPUT_SIZE)
+
+    timings = []
+    with torch.inference_mode():
+        for _ in range(3):
+            model(single)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(single)
+            timings.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        model(batch)
+        throughput = batch_size / (time.perf_counter() - start)
+    timings.sort()
+    return {
+        'variant': variant,
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'throughput': throughput,
+        'model_rss': rss_mb() - before,
+        'rss': rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artifact-dir', required=True)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.artifact_dir, args.iterations, args.batch_size, args.threads)))
+        return
+
+    from craftify.ml_utils import VARIANTS
+
+    print(f"torch threads: {args.threads}")
+    print(f"{'variant':13} {'p50 ms':>8} {'p95 ms':>8} {'batch img/s':>12} {'model MB':>9} {'RSS MB':>8}")
+    for variant in ['eager'] + sorted(VARIANTS):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', variant] + sys.argv[1:],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{variant:13} {result['p50']:8.1f} {result['p95']:8.1f} {result['throughput']:12.1f} "
+              f"{result['model_rss']:9.1f} {result['rss']:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold start of a web worker: django.setup() time, URLconf import time and RSS.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --max-setup-ms 800 --max-rss-mb 120   # exit 1 on regression
+
+Each run is a fresh interpreter. Heavy optional modules that were imported
+during startup are listed, since those should only load on first use.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['torch', 'torchvision', 'numpy', 'PIL.Image', 'django_seed', 'faker']
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure():
+    sys.path.insert(0, ROOT)
+    baseline = rss_mb()
+    start = time.perf_counter()
+    import django
+    django.setup()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from django.conf import settings
+    from django.urls import get_resolver
+    get_resolver(settings.ROOT_URLCONF).url_patterns  # imports every view module
+    urls = time.perf_counter() - start
+    return {
+        'setup_ms': setup * 1000,
+        'urls_ms': urls * 1000,
+        'baseline_mb': baseline,
+        'rss_mb': rss_mb(),
+        'heavy': [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def run(settings_module, runs):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    env.setdefault('DJANGO_SECRET_KEY', 'cold-start-benchmark')
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, __file__, '--child'], env=env, cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', action='append',
+                        help="Settings module to measure; repeat for several "
+                             "(default: craftify.settings and craftify.settings_production)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-setup-ms', type=float, help="Fail if median setup + URLconf time exceeds this")
+    parser.add_argument('--max-rss-mb', type=float, help="Fail if median RSS after startup exceeds this")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    failed = False
+    print(f"{'settings':28} {'setup ms':>9} {'urls ms':>8} {'base MB':>8} {'RSS MB':>7}  heavy modules loaded")
+    for settings_module in args.settings or ['craftify.settings', 'craftify.settings_production']:
+        results = run(settings_module, args.runs)
+        median = {key: statistics.median(result[key] for result in results)
+                  for key in ('setup_ms', 'urls_ms', 'baseline_mb', 'rss_mb')}
+        heavy = sorted({name for result in results for name in result['heavy']})
+        print(f"{settings_module:28} {median['setup_ms']:9.0f} {median['urls_ms']:8.0f} "
+              f"{median['baseline_mb']:8.1f} {median['rss_mb']:7.1f}  {', '.join(heavy) or '-'}")
+        if args.max_setup_ms is not None and median['setup_ms'] + median['urls_ms'] > args.max_setup_ms:
+            print(f"  startup {median['setup_ms'] + median['urls_ms']:.0f} ms exceeds {args.max_setup_ms:.0f} ms")
+            failed = True
+        if args.max_rss_mb is not None and median['rss_mb'] > args.max_rss_mb:
+            print(f"  RSS {median['rss_mb']:.1f} MB exceeds {args.max_rss_mb:.1f} MB")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
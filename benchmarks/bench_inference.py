@@ -0,0 +1,69 @@
+"""
+Images per second for the ResNet-18 classifier: one forward pass per image
+versus requests grouped by ml_utils.InferenceServer.
+
+    python benchmarks/bench_inference.py --images 256 --clients 16
+
+Uses untrained weights, which have the same cost as the real ones.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'craftify.settings')
+
+import django  # noqa: E402
+django.setup()
+
+import torch  # noqa: E402
+from craftify.ml_utils import InferenceServer, build_model  # noqa: E402
+
+
+def untrained_model():
+    return build_model().eval()
+
+
+def bench_single(model, images):
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for image in images:
+            model(image.unsqueeze(0)).argmax(dim=1).item()
+    return len(images) / (time.perf_counter() - start)
+
+
+def bench_batched(images, clients, max_batch_size, max_wait, threads):
+    server = InferenceServer(untrained_model, max_batch_size=max_batch_size,
+                             max_wait=max_wait, num_threads=threads)
+    server.submit(images[0]).result()  # load the model and warm up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(lambda image: server.submit(image).result(), images))
+    return len(images) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=128)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-wait', type=float, default=0.005)
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    images = [torch.rand(3, 224, 224) for _ in range(args.images)]
+    model = untrained_model()
+    bench_single(model, images[:4])  # warm up
+
+    single = bench_single(model, images)
+    batched = bench_batched(images, args.clients, args.max_batch_size, args.max_wait, args.threads)
+    print(f"torch threads: {args.threads}")
+    print(f"single calls:  {single:8.1f} images/s")
+    print(f"batched:       {batched:8.1f} images/s  (x{batched / single:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Query latency of /api/items/<id>/similar/'s top-k scan over a synthetic index.
+
+    python benchmarks/bench_similarity.py --items 500000 --dim 128
+
+Random unit vectors cost the same to scan as real embeddings.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'craftify.settings')
+
+import django  # noqa: E402
+django.setup()
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+from django.conf import settings  # noqa: E402
+from craftify import similarity  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=500000)
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    with tempfile.TemporaryDirectory() as directory:
+        settings.SIMILARITY_INDEX_DIR = directory
+        rng = np.random.default_rng(0)
+        vectors = similarity.Projection().apply(rng.standard_normal((args.items, args.dim), dtype=np.float32))
+        similarity.write_generation(directory, np.arange(1, args.items + 1), vectors, similarity.Projection())
+        del vectors
+
+        index = similarity.get_index()
+        ids = rng.integers(1, args.items + 1, args.queries)
+        index.similar(int(ids[0]), args.limit)  # fault the mapping into the page cache
+        timings = []
+        for item_id in ids:
+            start = time.perf_counter()
+            index.similar(int(item_id), args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        similarity.upsert(args.items + 1, rng.standard_normal(args.dim))
+        upsert = (time.perf_counter() - start) * 1000
+
+    timings.sort()
+    size = args.items * args.dim * 2 / 1e6
+    print(f"{args.items} items x {args.dim} dims float16 ({size:.0f} MB), torch threads: {args.threads}")
+    print(f"query p50 {statistics.median(timings):6.1f} ms   p95 {timings[int(len(timings) * 0.95) - 1]:6.1f} ms")
+    print(f"upsert    {upsert:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
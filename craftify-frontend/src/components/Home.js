@@ -4,17 +4,34 @@ import { Link } from 'react-router-dom';
 
 function Home() {
   const [items, setItems] = useState(null);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     api.get('items/')
       .then(response => {
-        setItems(response.data);
+        setItems(response.data.results);
+        setNextUrl(response.data.next);
       })
       .catch(() => {
         console.error('Error fetching items');
       });
   }, []);
 
+  function loadMore() {
+    // response.data.next is the full URL of the next cursor page
+    setLoadingMore(true);
+    api.get(nextUrl)
+      .then(response => {
+        setItems(prev => [...prev, ...response.data.results]);
+        setNextUrl(response.data.next);
+      })
+      .catch(() => {
+        console.error('Error fetching more items');
+      })
+      .finally(() => setLoadingMore(false));
+  }
+
   if (items === null) {
     return <p>Loading items...</p>;
   }
@@ -41,6 +58,11 @@ function Home() {
         ) : (
           <p>No items available for sale at the moment.</p>
         )}
+        {nextUrl && (
+          <button className="button" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -7,6 +7,8 @@ function MyItems() {
   const navigate = useNavigate();
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { isAuthenticated, userId } = useContext(AuthContext);
 
   useEffect(() => {
@@ -15,16 +17,28 @@ function MyItems() {
       navigate('/login');
       return;
     }
-    // Otherwise fetch items and filter by userId
-    api.get('items/')
+    // Otherwise fetch this user's items
+    api.get('items/', { params: { seller: userId } })
       .then(response => {
-        const userItems = response.data.filter(item => item.seller === userId);
-        setItems(userItems);
+        setItems(response.data.results);
+        setNextUrl(response.data.next);
         setLoading(false);
       })
       .catch(() => setLoading(false));
   }, [isAuthenticated, userId, navigate]);
 
+  function loadMore() {
+    // response.data.next is the full URL of the next cursor page, seller filter included
+    setLoadingMore(true);
+    api.get(nextUrl)
+      .then(response => {
+        setItems(prev => [...prev, ...response.data.results]);
+        setNextUrl(response.data.next);
+      })
+      .catch(() => alert('Error loading more items.'))
+      .finally(() => setLoadingMore(false));
+  }
+
   function handleDelete(id) {
     if (!window.confirm('Are you sure you want to delete this item?')) return;
     api.delete(`items/${id}/`)
@@ -66,6 +80,11 @@ function MyItems() {
       ) : (
         <p>No items found.</p>
       )}
+      {nextUrl && (
+        <button onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 }
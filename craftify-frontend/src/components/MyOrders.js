@@ -27,7 +27,8 @@ function MyOrders() {
     try {
       // We can pass a query param ?days=XX to get orders within XX days
       const response = await api.get(`orders/?days=${days}`);
-      setOrders(response.data);
+      // Newest first, one cursor page (response.data.next links to older orders)
+      setOrders(response.data.results);
     } catch (err) {
       console.error('Error fetching orders:', err);
       setError('Unable to load orders. Please try again.');
@@ -27,11 +27,10 @@ function Profile() {
         const userResp = await api.get(`user/${id}/`);
         setProfileUser(userResp.data);
 
-        const itemsResp = await api.get('items/');
-        const userItems = itemsResp.data.filter(
-          (item) => item.seller === parseInt(id, 10)
-        );
-        setItems(userItems);
+        const itemsResp = await api.get('items/', {
+          params: { seller: id, fields: 'id,name,price,quantity,image_urls' },
+        });
+        setItems(itemsResp.data.results);
 
         try {
           const commentsResp = await api.get(`user/${id}/comments/`);
@@ -157,9 +156,9 @@ function Profile() {
                 <p className="text-gray-600 mb-2">
                   ${item.price} {item.quantity ? `• Qty: ${item.quantity}` : ''}
                 </p>
-                {item.image ? (
+                {item.image_urls ? (
                   <img
-                    src={item.image}
+                    src={item.image_urls.thumb.webp}
                     alt={item.name}
                     className="w-full h-32 object-cover rounded"
                   />
@@ -7,6 +7,7 @@ export const CartProvider = ({ children }) => {
   const [cart, setCart] = useState({ items: [] });
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [summary, setSummary] = useState({ lines: 0, units: 0, total_price: '0.00', version: null });
 
   const fetchCart = useCallback(async () => {
     try {
@@ -65,14 +66,42 @@ export const CartProvider = ({ children }) => {
     }
   };
 
+  // Counts and total for the header badge, without the nested items.
+  const fetchSummary = useCallback(async () => {
+    try {
+      const response = await api.get('cart/summary/');
+      setSummary(response.data);
+      return response.data;
+    } catch (err) {
+      console.error('Cart summary error:', err);
+      return null;
+    }
+  }, []);
+
+  // operations: [{ item_id, quantity }], quantity 0 removes the item. One round trip for the whole batch.
+  const updateCart = async (operations) => {
+    try {
+      const response = await api.patch('cart/', operations);
+      setCart(response.data);
+      return true;
+    } catch (err) {
+      console.error('Update cart error:', err);
+      setError(err.message);
+      return false;
+    }
+  };
+
   return (
     <CartContext.Provider value={{
       cart,
+      summary,
       loading,
       error,
       fetchCart,
+      fetchSummary,
       addToCart,
       removeFromCart,
+      updateCart,
       clearError: () => setError(null)
     }}>
       {children}
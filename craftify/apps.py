@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class CraftifyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'craftify'
\ No newline at end of file
+    name = 'craftify'
+
+    def ready(self):
+        from craftify import signals  # noqa: F401
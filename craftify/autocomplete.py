@@ -0,0 +1,247 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import islice
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Typo tolerance only kicks in once the prefix is long enough to be specific.
+FUZZY_MIN_LENGTH = 3
+
+# Upper bound on index entries examined per lookup, so one-letter prefixes
+# over a huge catalog still answer in constant time.
+MAX_SCAN = 5000
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def item_keys(name, category):
+    """Every word-start suffix of the name plus the category, normalized."""
+    words = normalize(name).split()
+    keys = {' '.join(words[i:]) for i in range(len(words))}
+    category = normalize(category)
+    if category:
+        keys.add(category)
+    return keys
+
+
+def edits(prefix, alphabet):
+    """Prefixes one edit away from ``prefix``.
+
+    Substituting the last character or appending one is already covered by the
+    prefix with its last character deleted, so those variants are skipped.
+    """
+    variants = set()
+    for i in range(len(prefix)):
+        variants.add(prefix[:i] + prefix[i + 1:])
+        if i < len(prefix) - 1:
+            variants.add(prefix[:i] + prefix[i + 1] + prefix[i] + prefix[i + 2:])
+            for ch in alphabet:
+                variants.add(prefix[:i] + ch + prefix[i + 1:])
+        for ch in alphabet:
+            variants.add(prefix[:i] + ch + prefix[i:])
+    variants.discard(prefix)
+    variants.discard('')
+    return variants
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over item names and categories.
+
+    ``entries`` is one sorted list of ``(key, item_id)`` pairs, so a prefix
+    lookup is a bisect plus a short forward scan. Writers insert and delete
+    pairs in place under ``lock``, which costs a memmove rather than a copy
+    of the index. Readers take no lock: a pair is never torn, and a scan
+    racing a write at worst misses or repeats one neighbouring entry. Items
+    carry their display fields and popularity, so queries never touch the
+    database.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.items = {}
+        self.alphabet = set()
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, rows, popularity):
+        index = cls()
+        for item_id, name, category in rows:
+            index.items[item_id] = (name, category, popularity.get(item_id, 0))
+            for key in item_keys(name, category):
+                index.entries.append((key, item_id))
+                index.alphabet.update(key)
+        index.entries.sort()
+        return index
+
+    def add(self, item_id, name, category, popularity=None):
+        with self.lock:
+            previous = self._remove(item_id)
+            if popularity is None:
+                popularity = previous[2] if previous else 0
+            for key in item_keys(name, category):
+                insort(self.entries, (key, item_id))
+                self.alphabet.update(key)
+            self.items[item_id] = (name, category, popularity)
+
+    def remove(self, item_id):
+        with self.lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id):
+        """Drop the item from ``items`` and its pairs from ``entries``."""
+        entry = self.items.pop(item_id, None)
+        if entry is None:
+            return None
+        entries = self.entries
+        for key in item_keys(entry[0], entry[1]):
+            position = bisect_left(entries, (key, item_id))
+            if position < len(entries) and entries[position] == (key, item_id):
+                del entries[position]
+        return entry
+
+    def _collect(self, prefix, found, budget):
+        """Add ids under ``prefix`` to ``found``; return the scan budget left."""
+        entries = self.entries
+        scanned = 0
+        # islice re-checks the length on every step, so a concurrent delete
+        # cannot push the scan past the end of the list.
+        for key, item_id in islice(entries, bisect_left(entries, (prefix,)), None):
+            if scanned >= budget or not key.startswith(prefix):
+                break
+            found.add(item_id)
+            scanned += 1
+        return budget - scanned - 1
+
+    def lookup(self, prefix, limit=10, fuzzy=True):
+        """Return up to ``limit`` (item_id, name, category), most popular first.
+
+        Exact prefix matches always rank ahead of ones a single edit away.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        exact, near = set(), set()
+        budget = self._collect(prefix, exact, MAX_SCAN)
+        if fuzzy and len(exact) < limit and len(prefix) >= FUZZY_MIN_LENGTH:
+            for variant in edits(prefix, self.alphabet):
+                if budget <= 0:
+                    break
+                budget = self._collect(variant, near, budget)
+            near -= exact
+
+        # Reads are lock-free, so skip ids removed by a concurrent update.
+        items = self.items
+        exact = [(items[i][2], i) for i in exact if i in items]
+        near = [(items[i][2], i) for i in near if i in items]
+        ranked = heapq.nlargest(limit, exact)
+        if len(ranked) < limit:
+            ranked += heapq.nlargest(limit - len(ranked), near)
+        return [(item_id, items[item_id][0], items[item_id][1]) for _, item_id in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+# The background rebuild in progress, and the changes made while it scans.
+_rebuild = None
+_pending = []
+
+
+def load_index():
+    from craftify.models.item_controller import Item, PurchaseOrderItem
+
+    popularity = dict(
+        PurchaseOrderItem.objects.values('item_id')
+        .annotate(units=Sum('quantity'))
+        .values_list('item_id', 'units')
+    )
+    rows = Item.objects.order_by().values_list('id', 'name', 'category').iterator(chunk_size=2000)
+    return PrefixIndex.build(rows, popularity)
+
+
+def get_index():
+    """The worker's index, built from the database on first use.
+
+    Each process only sees its own signals, so the index is rebuilt once it is
+    older than ``AUTOCOMPLETE_MAX_AGE`` seconds to pick up other workers' writes.
+    The rebuild runs in a background thread; lookups keep using the old index
+    until the new one is swapped in.
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index()
+            return _index
+    if time.monotonic() - index.built_at > getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300):
+        _start_rebuild(index)
+    return index
+
+
+def _start_rebuild(stale):
+    global _rebuild
+    with _index_lock:
+        if _rebuild is not None or _index is not stale:
+            return
+        _rebuild = threading.Thread(target=_rebuild_index, args=(stale,), name='autocomplete-rebuild', daemon=True)
+        _rebuild.start()
+
+
+def _rebuild_index(stale):
+    global _index, _rebuild
+    try:
+        index = load_index()
+        with _index_lock:
+            # The scan may already include these changes; replaying is harmless.
+            for change in _pending:
+                if change[1] is None:
+                    index.remove(change[0])
+                else:
+                    index.add(*change)
+            if _index is stale:
+                _index = index
+    finally:
+        with _index_lock:
+            _rebuild = None
+            _pending.clear()
+        connection.close()
+
+
+def _apply(item_id, name=None, category=None):
+    with _index_lock:
+        index = _index
+        if _rebuild is not None:
+            # Replayed onto the new index, which this change may have missed.
+            _pending.append((item_id, name, category))
+    if index is None:
+        return
+    if name is None:
+        index.remove(item_id)
+    else:
+        index.add(item_id, name, category)
+
+
+def item_saved(item):
+    _apply(item.pk, item.name, item.category)
+
+
+def item_deleted(item_id):
+    _apply(item_id)
+
+
+def reset():
+    global _index
+    _index = None
@@ -0,0 +1,254 @@
+import atexit
+import contextlib
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from craftify import inventory
+from craftify.models.cart_controller import Cart, CartItem
+from craftify.models.item_controller import Item
+
+logger = logging.getLogger(__name__)
+
+# Written-behind adds wait in the cart cache, shared by every worker, for up
+# to this long if nothing flushes them.
+PENDING_TIMEOUT = 24 * 3600
+
+# Timers this process started to flush each cart's pending adds.
+_timers = {}
+_timers_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'CART_CACHE_ALIAS', 'default')]
+
+
+@contextlib.contextmanager
+def cache_lock(key, wait=5.0):
+    """
+    Lock ``key`` in the cart cache for a read-modify-write of its value.
+
+    The lock is a cache.add() every worker sees, so it also serializes
+    workers that do not share memory. It expires after ``wait`` seconds, so
+    a crashed holder cannot block the key for longer.
+    """
+    cache = get_cache()
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, 1, timeout=wait):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting for {lock_key}")
+        time.sleep(0.005)
+    try:
+        yield cache
+    finally:
+        cache.delete(lock_key)
+
+
+def upsert_sql(rows=1):
+    quote = connection.ops.quote_name
+    table = quote(CartItem._meta.db_table)
+    return (
+        f"INSERT INTO {table} (cart_id, item_id, quantity, held_quantity, added_at) "
+        f"VALUES {', '.join(['(%s, %s, %s, 0, %s)'] * rows)} "
+        f"ON CONFLICT (cart_id, item_id) DO UPDATE SET quantity = {table}.quantity + excluded.quantity "
+        f"RETURNING id, quantity, held_quantity, added_at"
+    )
+
+
+def add(cart_id, item_id, quantity=1):
+    """
+    Add ``quantity`` of an item to a cart and return the CartItem.
+
+    One INSERT ... ON CONFLICT (cart, item) DO UPDATE creates the line or
+    adds to it inside the database, so concurrent adds never lose an
+    increment. The line's stock is then held (inventory.hold); if there is
+    not enough, InsufficientStock is raised and the add is rolled back.
+    """
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+    with inventory.write_transaction():
+        with connection.cursor() as cursor:
+            cursor.execute(upsert_sql(), [cart_id, item_id, quantity, timezone.now()])
+            line_id, total, held, added_at = cursor.fetchone()
+        cart_item = CartItem(id=line_id, cart_id=cart_id, item_id=item_id, quantity=total,
+                             held_quantity=held, added_at=added_at)
+        # Raw SQL skips the CartItem signals.
+        Cart.touch(cart_id)
+        inventory.hold(CartItem.objects.filter(pk=line_id))
+    cart_item.held_quantity = cart_item.quantity
+    return cart_item
+
+
+def delete_lines(line_ids):
+    """
+    Delete cart lines in one statement. Their holds must already be released,
+    and the caller touches the cart: a queryset delete would send pre/post_delete
+    (and touch the cart) once per line.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(CartItem._meta.db_table)} "
+            f"WHERE id IN ({', '.join(['%s'] * len(line_ids))})",
+            line_ids
+        )
+
+
+def set_quantities(cart_id, quantities):
+    """
+    Set ``{item_id: quantity}`` on a cart in one transaction; 0 removes the line.
+
+    Removed lines give their holds back and go in one DELETE; the rest are
+    written with one multi-row upsert and held together, so the number of
+    queries does not grow with the number of lines.
+    """
+    removed = [item_id for item_id, quantity in quantities.items() if quantity == 0]
+    kept = {item_id: quantity for item_id, quantity in quantities.items() if quantity > 0}
+    now = timezone.now()
+    with inventory.write_transaction():
+        if removed:
+            line_ids = list(
+                CartItem.objects.filter(cart_id=cart_id, item_id__in=removed).values_list('id', flat=True)
+            )
+            if line_ids:
+                inventory.release(line_ids)
+                delete_lines(line_ids)
+        if kept:
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=cart_id, item_id=item_id, quantity=quantity, added_at=now)
+                 for item_id, quantity in kept.items()],
+                update_conflicts=True,
+                unique_fields=['cart', 'item'],
+                update_fields=['quantity'],
+            )
+            inventory.hold(CartItem.objects.filter(cart_id=cart_id, item_id__in=kept))
+        Cart.touch(cart_id)
+
+
+def add_many(cart_id, quantities):
+    """add() for ``{item_id: quantity}``: one multi-row upsert, then one hold for all the lines."""
+    now = timezone.now()
+    params = []
+    for item_id, quantity in sorted(quantities.items()):
+        params += [cart_id, item_id, quantity, now]
+    with inventory.write_transaction():
+        with connection.cursor() as cursor:
+            cursor.execute(upsert_sql(len(quantities)), params)
+        Cart.touch(cart_id)
+        inventory.hold(CartItem.objects.filter(cart_id=cart_id, item_id__in=quantities))
+
+
+def add_available(cart_id, quantities, attempts=3):
+    """
+    add_many(), trimming what is added of a short item to the stock left
+    instead of failing. Returns the quantities actually added.
+
+    Used where the buyer is not waiting on the answer (merging a guest cart
+    at login, flushing written-behind adds), so there is nobody to show a
+    409 to.
+    """
+    quantities = {item_id: quantity for item_id, quantity in quantities.items() if quantity > 0}
+    for attempt in range(attempts):
+        if not quantities:
+            break
+        try:
+            add_many(cart_id, quantities)
+            break
+        except inventory.InsufficientStock as exc:
+            if attempt == attempts - 1:
+                raise
+            for item_id, (wanted, available) in exc.shortages.items():
+                quantities[item_id] -= wanted - available
+            quantities = {item_id: quantity for item_id, quantity in quantities.items() if quantity > 0}
+    return quantities
+
+
+def pending_key(cart_id):
+    return f'cart:pending:{cart_id}'
+
+
+def add_later(cart_id, item_id, quantity=1):
+    """
+    add(), written behind when CART_WRITE_BEHIND is set.
+
+    Adds to the same cart within CART_WRITE_BEHIND seconds of the first are
+    summed in the cart cache and written by one add_available() when the
+    window closes, so ten taps on "+" cost one upsert. The sum lives in the
+    shared cache rather than this process, so a flush() from any worker (a
+    cart read, checkout) writes it, and a worker dying loses nothing.
+
+    Stock is checked, not held, before the add is accepted: InsufficientStock
+    is raised as add() would if the line plus its pending adds cannot be
+    held now. Returns the CartItem when written at once, else None.
+    """
+    delay = getattr(settings, 'CART_WRITE_BEHIND', 0)
+    if not delay:
+        return add(cart_id, item_id, quantity)
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+    key = pending_key(cart_id)
+    with cache_lock(key) as cache:
+        pending = cache.get(key) or {}
+        line = CartItem.objects.filter(cart_id=cart_id, item_id=item_id).values_list(
+            'quantity', 'held_quantity').first() or (0, 0)
+        wanted = line[0] + pending.get(item_id, 0) + quantity
+        short = inventory.shortages({item_id: wanted}, {item_id: line[1]})
+        if short:
+            raise inventory.InsufficientStock(short)
+        pending[item_id] = pending.get(item_id, 0) + quantity
+        cache.set(key, pending, timeout=PENDING_TIMEOUT)
+    with _timers_lock:
+        if cart_id not in _timers:
+            timer = threading.Timer(delay, run, [cart_id])
+            timer.daemon = True
+            _timers[cart_id] = timer
+            timer.start()
+    return None
+
+
+def flush(cart_id):
+    """
+    Write the cart's pending adds now; returns the quantities added.
+
+    Items deleted since are dropped, and anything another cart took
+    meanwhile is trimmed to the stock left, with a warning in the log.
+    """
+    if not getattr(settings, 'CART_WRITE_BEHIND', 0):
+        return {}
+    with _timers_lock:
+        timer = _timers.pop(cart_id, None)
+    if timer is not None:
+        timer.cancel()
+    key = pending_key(cart_id)
+    with cache_lock(key) as cache:
+        quantities = cache.get(key)
+        cache.delete(key)
+    if not quantities:
+        return {}
+    existing = set(Item.objects.filter(pk__in=quantities).values_list('id', flat=True))
+    added = add_available(cart_id, {
+        item_id: quantity for item_id, quantity in quantities.items() if item_id in existing
+    })
+    if added != quantities:
+        logger.warning("Pending adds to cart %s were trimmed from %s to %s", cart_id, quantities, added)
+    return added
+
+
+def run(cart_id):
+    try:
+        flush(cart_id)
+    except Exception:
+        logger.exception("Could not write pending adds to cart %s", cart_id)
+    finally:
+        # Timer threads own their own connection.
+        connection.close()
+
+
+@atexit.register
+def flush_all():
+    """Flush the carts this process has timers for; other workers' stay in the cache."""
+    for cart_id in list(_timers):
+        run(cart_id)
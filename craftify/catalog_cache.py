@@ -0,0 +1,110 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+# Version scopes. A cached response embeds the current version of every scope
+# it depends on; bumping a scope orphans those entries so they age out.
+ALL = 'all'
+
+
+def seller_scope(seller_id):
+    return f'seller:{seller_id}'
+
+
+def category_scope(category):
+    return f'category:{category or ""}'
+
+
+def item_scope(item_id):
+    return f'item:{item_id}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def version_key(scope):
+    return f'catalog:version:{scope}'
+
+
+def get_versions(scopes):
+    cache = get_cache()
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, 1, timeout=None)
+            found[key] = cache.get(key, 1)
+        versions.append(found[key])
+    return versions
+
+
+def bump(*scopes):
+    cache = get_cache()
+    for scope in set(scopes):
+        key = version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Unknown key: start above the implicit 1 readers may have cached.
+            cache.add(key, 2, timeout=None)
+
+
+def bump_item(item_id, seller_id, *categories):
+    """Invalidate every cached response that can include this item."""
+    bump(ALL, item_scope(item_id), seller_scope(seller_id), *(category_scope(c) for c in categories))
+
+
+def list_scopes(params):
+    """The narrowest version scopes that cover an item list query."""
+    scopes = []
+    if 'seller' in params:
+        try:
+            scopes.append(seller_scope(int(params['seller'])))
+        except ValueError:
+            pass
+    if 'category' in params:
+        scopes.append(category_scope(params['category']))
+    return scopes or [ALL]
+
+
+def make_key(kind, scopes, request):
+    versions = get_versions(scopes)
+    query = sorted(request.query_params.lists())
+    raw = f'{request.get_host()}|{request.path}|{query}|{list(zip(scopes, versions))}'
+    return f'catalog:{kind}:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def get_or_build(key, build):
+    """
+    Return the cached value for ``key`` or build and store it.
+
+    On a miss only the worker that wins the lock builds; the others poll the
+    cache for up to CATALOG_CACHE_LOCK_WAIT seconds before building anyway,
+    so a cold popular key costs one rebuild instead of one per worker.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = key + ':lock'
+    lock_wait = getattr(settings, 'CATALOG_CACHE_LOCK_WAIT', 2.0)
+    timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+    if cache.add(lock_key, 1, timeout=lock_wait * 2):
+        try:
+            value = build()
+            cache.set(key, value, timeout=timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + lock_wait
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from craftify import autocomplete, catalog_cache
+
+logger = logging.getLogger(__name__)
+
+
+def labels():
+    """Category name for each classifier output index."""
+    return getattr(settings, 'CLASSIFIER_CATEGORIES', ['Class A', 'Class B'])
+
+
+def model_key():
+    """Identifies the model a cached prediction came from; new weights get a new key."""
+    variant = getattr(settings, 'CLASSIFIER_VARIANT', 'eager')
+    return f"{variant}:{getattr(settings, 'CLASSIFIER_MODEL_VERSION', 1)}"
+
+
+def serve_predictions(tensors):
+    """Class indices from the shared inference server, which batches across workers."""
+    from craftify import ml_utils
+
+    futures = [ml_utils.submit_inference(tensor) for tensor in tensors]
+    return [future.result() for future in futures]
+
+
+def cached_predictions(digests):
+    from craftify.models.item_controller import ImagePrediction
+
+    return dict(
+        ImagePrediction.objects.filter(model=model_key(), digest__in=list(digests))
+        .values_list('digest', 'category')
+    )
+
+
+def remember(predictions):
+    from craftify.models.item_controller import ImagePrediction
+
+    key = model_key()
+    ImagePrediction.objects.bulk_create(
+        [ImagePrediction(digest=digest, model=key, category=category) for digest, category in predictions.items()],
+        ignore_conflicts=True,
+    )
+
+
+def apply(item_id, source, digest, category):
+    """
+    Record the prediction on the item and fill in its category.
+
+    A category the seller picked is kept; only an empty one, or one the
+    classifier wrote earlier, is replaced. Nothing is written if the image
+    or the category changed since the job was queued. Returns True when the
+    category changed.
+    """
+    from craftify.models.item_controller import Item
+
+    row = (
+        Item.objects.filter(pk=item_id, image=source)
+        .values('seller_id', 'name', 'category', 'image_prediction')
+        .first()
+    )
+    if row is None:
+        return False
+    current = row['category']
+    predicted_before = (row['image_prediction'] or {}).get('category')
+    changed = (not current or current == predicted_before) and category != current
+    changes = {'image_prediction': {'source': source, 'digest': digest, 'category': category}}
+    if changed:
+        changes.update(category=category, updated_at=timezone.now())
+    updated = Item.objects.filter(pk=item_id, image=source, category=current).update(**changes)
+    if not (updated and changed):
+        return False
+
+    # Queryset updates skip the Item signals, so invalidate by hand.
+    catalog_cache.bump_item(item_id, row['seller_id'], current, category)
+    item = Item(pk=item_id, name=row['name'], category=category)
+    transaction.on_commit(lambda: autocomplete.item_saved(item))
+    return True
+
+
+def categorize(rows, predict=None):
+    """
+    Categorize ``[(item_id, image_name)]`` and return how many items changed.
+
+    Images are keyed by content hash: digests with a cached prediction for
+    the current model, and duplicates within the batch, never reach
+    ``predict``, which maps a list of image tensors to class indices.
+    """
+    jobs = []
+    for item_id, source in rows:
+        try:
+            with default_storage.open(source, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            logger.warning("Image %s for item %s is missing; not categorizing", source, item_id)
+            continue
+        jobs.append((item_id, source, hashlib.sha256(data).hexdigest(), data))
+
+    from craftify import ml_utils
+
+    known = cached_predictions({digest for _, _, digest, _ in jobs})
+    pending = {}
+    for _, _, digest, data in jobs:
+        if digest not in known and digest not in pending:
+            pending[digest] = ml_utils.image_tensor(data)
+    if pending:
+        names = labels()
+        indices = (predict or serve_predictions)(list(pending.values()))
+        predicted = {digest: names[index] for digest, index in zip(pending, indices)}
+        remember(predicted)
+        known.update(predicted)
+
+    return sum(apply(item_id, source, digest, known[digest]) for item_id, source, digest, _ in jobs)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'CATEGORIZER_WORKERS', 4),
+                    thread_name_prefix='categorizer',
+                )
+    return _executor
+
+
+def schedule(item):
+    """
+    Queue categorization of ``item.image`` if it changed since the last prediction.
+
+    Reading, hashing and decoding run on the categorizer threads and the
+    forward pass on the inference server, so saves never wait for the model.
+    CATEGORIZER_SYNC runs the job inline instead. Nothing is queued until
+    a trained model is deployed.
+    """
+    from craftify import ml_utils
+
+    if not item.image or not ml_utils.is_available():
+        return
+    if (item.image_prediction or {}).get('source') == item.image.name:
+        return
+    rows = [(item.pk, item.image.name)]
+    if getattr(settings, 'CATEGORIZER_SYNC', False):
+        categorize(rows)
+    else:
+        get_executor().submit(run, rows)
+
+
+def run(rows):
+    try:
+        categorize(rows)
+    except Exception:
+        logger.exception("Could not categorize items %s", [item_id for item_id, _ in rows])
+    finally:
+        # Worker threads own their own connection.
+        connection.close()
@@ -0,0 +1,90 @@
+import csv
+import json
+from craftify.models.item_controller import Item
+
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Column name -> ORM path. The seller's username comes from the same join, so
+# exporting never issues a query per row.
+COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'quantity': 'quantity',
+    'category': 'category',
+    'image': 'image',
+    'seller': 'seller_id',
+    'seller_username': 'seller__username',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+class Echo:
+    """Pseudo-buffer whose write() hands the formatted line straight back."""
+    def write(self, value):
+        return value
+
+
+def export_queryset(seller_id=None):
+    queryset = Item.objects.order_by('pk')
+    if seller_id is not None:
+        queryset = queryset.filter(seller_id=seller_id)
+    return queryset.values_list(*COLUMNS.values())
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Rows from a server-side cursor, ``chunk_size`` at a time."""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(list(COLUMNS))
+    for row in rows:
+        yield writer.writerow([format_value(value) for value in row])
+
+
+def json_value(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return format_value(value)
+
+
+def ndjson_lines(rows):
+    names = list(COLUMNS)
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(json_value, row)))) + '\n'
+
+
+def stream(fmt, seller_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the export as text blocks of ``chunk_size`` rows.
+
+    Only one block of rows is alive at any time, so memory does not grow
+    with the size of the catalog.
+    """
+    rows = iter_rows(export_queryset(seller_id), chunk_size)
+    lines = csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) >= chunk_size:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
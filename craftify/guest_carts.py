@@ -0,0 +1,100 @@
+import logging
+import secrets
+from django.conf import settings
+from craftify import carts
+from craftify.models.cart_controller import Cart
+from craftify.models.item_controller import Item
+
+logger = logging.getLogger(__name__)
+
+# Session entry naming the visitor's guest cart. A token rather than the
+# session key itself, because login rotates the session key but keeps its data.
+SESSION_KEY = 'guest_cart'
+
+
+def cache_key(token):
+    return f'cart:guest:{token}'
+
+
+def get_token(request, create=False):
+    token = request.session.get(SESSION_KEY)
+    if token is None and create:
+        token = request.session[SESSION_KEY] = secrets.token_urlsafe(16)
+    return token
+
+
+def lines(request):
+    """The visitor's cart as ``{item_id: quantity}``; nothing is written to the database."""
+    token = get_token(request)
+    if token is None:
+        return {}
+    return carts.get_cache().get(cache_key(token)) or {}
+
+
+def update(request, change):
+    """
+    Apply ``change`` to the visitor's ``{item_id: quantity}`` and save it.
+
+    The read, change and write happen under carts.cache_lock(), so
+    concurrent requests (two tabs, a double tap) never lose each other's
+    changes. Returns the saved quantities.
+    """
+    key = cache_key(get_token(request, create=True))
+    with carts.cache_lock(key) as cache:
+        quantities = cache.get(key) or {}
+        change(quantities)
+        cache.set(key, quantities, timeout=getattr(settings, 'GUEST_CART_TIMEOUT', 7 * 24 * 3600))
+    return quantities
+
+
+def add(request, item_id, quantity=1):
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+
+    def change(current):
+        current[item_id] = current.get(item_id, 0) + quantity
+
+    return update(request, change)
+
+
+def set_quantities(request, quantities):
+    """Set ``{item_id: quantity}``; 0 removes the item."""
+    def change(current):
+        for item_id, quantity in quantities.items():
+            if quantity:
+                current[item_id] = quantity
+            else:
+                current.pop(item_id, None)
+
+    return update(request, change)
+
+
+def clear(request):
+    token = request.session.pop(SESSION_KEY, None)
+    if token is not None:
+        carts.get_cache().delete(cache_key(token))
+
+
+def merge(request, user):
+    """
+    Move the visitor's guest cart into ``user``'s Cart on login.
+
+    Quantities are added to any lines the user already has with one
+    multi-row upsert; items that sold out meanwhile are trimmed to what is
+    left. Returns the quantities added. If the merge fails it is logged and
+    the guest cart kept, so the login itself still succeeds.
+    """
+    quantities = lines(request)
+    if not quantities:
+        return {}
+    try:
+        existing = set(Item.objects.filter(pk__in=quantities).values_list('id', flat=True))
+        cart, _ = Cart.objects.get_or_create(user=user)
+        added = carts.add_available(cart.pk, {
+            item_id: quantity for item_id, quantity in quantities.items() if item_id in existing
+        })
+    except Exception:
+        logger.exception("Could not merge the guest cart into user %s's cart", user.pk)
+        return {}
+    clear(request)
+    return added
@@ -0,0 +1,105 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from craftify.models.idempotency_controller import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+
+def request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode('utf-8')).hexdigest()
+
+
+def lookup(user, key):
+    """The stored (request_hash, status_code, response) for a key, via the (user, key) unique index."""
+    return IdempotencyKey.objects.filter(
+        user=user, key=key, created_at__gte=timezone.now() - ttl()
+    ).values_list('request_hash', 'status_code', 'response').first()
+
+
+def replay(stored, digest):
+    stored_hash, status_code, data = stored
+    if stored_hash != digest:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(data, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Let clients retry a POST safely by sending an Idempotency-Key header.
+
+    The first request with a key runs ``view`` in a transaction that also
+    records the key with the response; 5xx responses are not recorded, so
+    they can be retried. A repeat within IDEMPOTENCY_KEY_TTL is answered from
+    the record with one indexed lookup and no transaction, or 422 if the key
+    comes with a different body. A concurrent duplicate waits on the key's
+    unique index and then replays the first response.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': f'{HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+        digest = request_hash(request)
+        stored = lookup(request.user, key)
+        if stored is not None:
+            return replay(stored, digest)
+
+        duplicate = False
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    # Expired keys may still be waiting for prune(); reclaim them.
+                    IdempotencyKey.objects.filter(
+                        user=request.user, key=key, created_at__lt=timezone.now() - ttl()
+                    ).delete()
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, request_hash=digest)
+            except IntegrityError:
+                duplicate = True
+            if not duplicate:
+                response = view(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    IdempotencyKey.objects.filter(pk=record.pk).update(
+                        status_code=response.status_code, response=response.data
+                    )
+        if duplicate:
+            stored = lookup(request.user, key)
+            if stored is None or stored[1] is None:
+                return Response({'error': 'A request with this key is in progress'}, status=status.HTTP_409_CONFLICT)
+            return replay(stored, digest)
+        return response
+    return wrapper
+
+
+def prune(batch_size=1000):
+    """Delete keys older than IDEMPOTENCY_KEY_TTL in batches along the created_at index; returns the count."""
+    cutoff = timezone.now() - ttl()
+    total = 0
+    while True:
+        batch = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return total
+        total += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,138 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from craftify import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative; aspect ratio is preserved.
+SIZES = {'thumb': 200, 'medium': 800}
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = 82
+
+
+def derivative_name(digest, size, ext):
+    """Content-addressed storage path, safe to serve with a far-future cache lifetime."""
+    return f'derivatives/{digest[:2]}/{digest}-{size}.{ext}'
+
+
+def render(data):
+    """Resize one original into every size and format. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    for size, edge in SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge))
+        for ext, pil_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, quality=QUALITY)
+            rendered[(size, ext)] = buffer.getvalue()
+    return rendered
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _executor
+
+
+def schedule(instance, field_name, state_field, cache_scopes=()):
+    """
+    Queue derivative generation for ``instance.<field_name>`` if it changed.
+
+    ``state_field`` is a JSONField recording which source file the stored
+    derivatives belong to; until it matches, serializers fall back to the
+    original. Resizing runs in the process pool unless
+    IMAGE_DERIVATIVES_SYNC is set.
+    """
+    image = getattr(instance, field_name)
+    if not image:
+        return
+    state = getattr(instance, state_field) or {}
+    if state.get('source') == image.name:
+        return
+
+    with image.open('rb') as handle:
+        data = handle.read()
+    digest = hashlib.sha256(data).hexdigest()
+    job = (instance._meta.label, instance.pk, field_name, state_field, image.name, digest, tuple(cache_scopes))
+
+    if all(default_storage.exists(derivative_name(digest, size, ext)) for size in SIZES for ext in FORMATS):
+        store(job, {})
+    elif getattr(settings, 'IMAGE_DERIVATIVES_SYNC', False):
+        store(job, render(data))
+    else:
+        future = get_executor().submit(render, data)
+        future.add_done_callback(lambda done: finish(job, done))
+
+
+def finish(job, future):
+    try:
+        store(job, future.result())
+    except Exception:
+        logger.exception("Could not build image derivatives for %s %s", job[0], job[1])
+    finally:
+        # Callbacks run on the executor's thread, which owns its own connection.
+        connection.close()
+
+
+def store(job, rendered):
+    label, pk, field_name, state_field, source, digest, cache_scopes = job
+    for (size, ext), content in rendered.items():
+        name = derivative_name(digest, size, ext)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+    # Only mark ready if the image was not replaced while we were resizing.
+    apps.get_model(label).objects.filter(pk=pk, **{field_name: source}).update(**{
+        state_field: {'source': source, 'digest': digest},
+        'updated_at': timezone.now(),
+    })
+    if cache_scopes:
+        catalog_cache.bump(*cache_scopes)
+
+
+def image_urls(image, state, request=None):
+    """
+    Original plus derivative URLs for an image field.
+
+    Derivatives that are not ready yet (or belong to a previous upload) fall
+    back to the original URL, so clients can always use the sized entries.
+    """
+    if not image:
+        return None
+    state = state or {}
+    digest = state.get('digest') if state.get('source') == image.name else None
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if request is not None else url
+
+    original = absolute(image.url)
+    urls = {'original': original}
+    for size in SIZES:
+        urls[size] = {
+            ext: absolute(default_storage.url(derivative_name(digest, size, ext))) if digest else original
+            for ext in FORMATS
+        }
+    return urls
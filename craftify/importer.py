@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from django.db import transaction
+from rest_framework import serializers
+from craftify.models.item_controller import Item
+from craftify import search, autocomplete, catalog_cache
+
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Columns overwritten when an imported row matches an existing (seller, name).
+UPDATE_FIELDS = ['description', 'price', 'quantity', 'category', 'updated_at']
+
+
+class ItemImportSerializer(serializers.Serializer):
+    """Validates one import row without touching the database."""
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    quantity = serializers.IntegerField(min_value=1)
+    category = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+
+
+def detect_format(filename, content_type=''):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (row_number, dict or error message) from a binary stream, one line at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f'Invalid JSON: {exc}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Each line must be a JSON object.'
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row, detail):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': detail})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def import_items(stream, fmt, seller, chunk_size=CHUNK_SIZE):
+    """
+    Upsert items for ``seller`` from a CSV or NDJSON byte stream.
+
+    Rows are validated and written ``chunk_size`` at a time, each chunk as one
+    INSERT ... ON CONFLICT (seller, name) DO UPDATE, so memory stays flat no
+    matter how large the file is. Invalid rows are reported and skipped.
+    """
+    result = ImportResult()
+    chunk = {}
+    # One serializer validates every row; binding a new one per row would
+    # deep-copy its fields each time and dominate the import.
+    validator = ItemImportSerializer()
+    for number, row in read_rows(stream, fmt):
+        if isinstance(row, str):
+            result.add_error(number, {'non_field_errors': [row]})
+            continue
+        try:
+            data = validator.run_validation(row)
+        except serializers.ValidationError as exc:
+            result.add_error(number, exc.detail)
+            continue
+        # A later row for the same name in the chunk replaces the earlier one.
+        chunk[data['name']] = data
+        if len(chunk) >= chunk_size:
+            write_chunk(chunk, seller, result)
+            chunk = {}
+    if chunk:
+        write_chunk(chunk, seller, result)
+    return result
+
+
+def write_chunk(chunk, seller, result):
+    with transaction.atomic():
+        existing = dict(
+            Item.objects.filter(seller=seller, name__in=list(chunk)).values_list('name', 'category')
+        )
+        items = Item.objects.bulk_create(
+            [Item(seller=seller, **data) for data in chunk.values()],
+            update_conflicts=True,
+            unique_fields=['seller', 'name'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create skips model signals, so keep the derived indexes in step here.
+        search.index_items(items)
+        categories = {item.category for item in items} | set(existing.values())
+        catalog_cache.bump(
+            catalog_cache.ALL,
+            catalog_cache.seller_scope(seller.pk),
+            *(catalog_cache.category_scope(category) for category in categories),
+        )
+        transaction.on_commit(lambda: [autocomplete.item_saved(item) for item in items])
+    result.updated += len(existing)
+    result.created += len(chunk) - len(existing)
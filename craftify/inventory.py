@@ -0,0 +1,241 @@
+import contextlib
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Case, When, Value, IntegerField
+from django.utils import timezone
+from craftify import catalog_cache
+from craftify.models.item_controller import Item
+from craftify.models.cart_controller import CartItem
+
+
+class InsufficientStock(Exception):
+    """Raised when a reservation asks for more units than an item has left."""
+
+    def __init__(self, shortages):
+        # {item_id: (requested, available)}
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f'item {item_id}: requested {requested}, available {available}'
+            for item_id, (requested, available) in sorted(shortages.items())
+        ))
+
+
+@contextlib.contextmanager
+def write_transaction():
+    """
+    transaction.atomic() for code that reads stock and then changes it.
+
+    On SQLite the outermost block starts with BEGIN IMMEDIATE, taking the
+    write lock up front and waiting up to the connection timeout for it. A
+    deferred transaction that reads first cannot wait: SQLite fails its
+    first write with "database is locked" when another writer got in
+    between. Nested blocks are plain savepoints, and other backends lock
+    rows themselves.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic():
+            # BEGIN has been sent; later transactions keep the configured mode.
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+def reserve(lines):
+    """
+    Take ``[(item_id, quantity)]`` out of stock, all or nothing.
+
+    Units held by other carts are not available. The items are locked in
+    primary-key order (lock_items), so concurrent checkouts of overlapping
+    items queue instead of deadlocking. Then one conditional UPDATE
+    (``quantity >= held_quantity + n``, with each item's n from a CASE)
+    checks and decrements every item, so the check and the decrement cannot
+    interleave with another checkout and the query count does not grow with
+    the order. If any item is short, the decrements are rolled back and
+    InsufficientStock lists the shortfalls.
+    """
+    requested = Counter()
+    for item_id, quantity in lines:
+        requested[item_id] += quantity
+    if not requested:
+        return
+    amount = per_item(requested)
+    with write_transaction():
+        lock_items(requested)
+        updated = Item.objects.filter(pk__in=requested, quantity__gte=F('held_quantity') + amount).update(
+            quantity=F('quantity') - amount, updated_at=timezone.now()
+        )
+        if updated < len(requested):
+            # Undo the items that fit before reporting the ones that did not.
+            transaction.set_rollback(True)
+    if updated < len(requested):
+        raise InsufficientStock(shortages(requested))
+
+    invalidate(requested)
+
+
+def lock_items(item_ids):
+    """
+    Lock the items' rows in primary-key order before a multi-row UPDATE.
+
+    An UPDATE ... WHERE pk IN (...) locks rows in whatever order the plan
+    visits them, so two of them over overlapping items could deadlock.
+    SQLite has no row locks (write_transaction takes its one write lock),
+    so there is nothing to do there.
+    """
+    if connection.features.has_select_for_update:
+        list(Item.objects.select_for_update().filter(pk__in=item_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def per_item(amounts):
+    """A CASE giving each item its own amount, so one UPDATE can change many items."""
+    return Case(
+        *[When(pk=item_id, then=Value(amount)) for item_id, amount in sorted(amounts.items())],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def shortages(requested, own=None):
+    """
+    ``{item_id: (requested, available)}`` for the items that cannot supply
+    ``requested``, counting ``own`` units (already held by the asking cart)
+    as available.
+    """
+    own = own or {}
+    stock = {item_id: (quantity, held)
+             for item_id, quantity, held in Item.objects.filter(pk__in=requested).values_list('id', 'quantity', 'held_quantity')}
+    short = {}
+    for item_id, quantity in requested.items():
+        in_stock, held = stock.get(item_id, (0, 0))
+        have = max(in_stock - held, 0) + own.get(item_id, 0)
+        if have < quantity:
+            short[item_id] = (quantity, have)
+    return short
+
+
+def reserve_cart(cart_items):
+    """reserve() a cart's lines, counting the stock they hold as available to them."""
+    with write_transaction():
+        release([cart_item.pk for cart_item in cart_items])
+        reserve((cart_item.item_id, cart_item.quantity) for cart_item in cart_items)
+
+
+def hold_expiry():
+    """Lines added before this no longer hold stock."""
+    return timezone.now() - timedelta(seconds=getattr(settings, 'CART_HOLD_TTL', 900))
+
+
+def hold(lines):
+    """
+    Hold stock for the full quantity of each cart line and restart their TTL.
+
+    ``lines`` is a CartItem queryset. Each item's hold only changes by the
+    difference from what its lines already hold, all in one conditional
+    UPDATE like reserve()'s. Lines, then items, are locked in primary-key
+    order, as release() and reserve() do. InsufficientStock leaves the
+    lines and items unchanged.
+    """
+    with write_transaction():
+        rows = list(lines.select_for_update().order_by('pk').values_list('id', 'item_id', 'quantity', 'held_quantity'))
+        change, wanted, held = Counter(), Counter(), Counter()
+        for _, item_id, quantity, line_held in rows:
+            change[item_id] += quantity - line_held
+            wanted[item_id] += quantity
+            held[item_id] += line_held
+        change = {item_id: amount for item_id, amount in change.items() if amount}
+        now = timezone.now()
+        if change:
+            amount = per_item(change)
+            lock_items(change)
+            with transaction.atomic():
+                updated = Item.objects.filter(pk__in=change, quantity__gte=F('held_quantity') + amount).update(
+                    held_quantity=F('held_quantity') + amount, updated_at=now
+                )
+                if updated < len(change):
+                    transaction.set_rollback(True)
+            if updated < len(change):
+                raise InsufficientStock(shortages({item_id: wanted[item_id] for item_id in change}, held))
+        CartItem.objects.filter(pk__in=[line_id for line_id, _, _, _ in rows]).update(
+            held_quantity=F('quantity'), added_at=now
+        )
+        invalidate(change)
+
+
+def release(cart_item_ids, expired_before=None):
+    """
+    Give the stock held by these cart lines back; returns how many lines held any.
+
+    The lines and then their items are locked in primary-key order, the
+    order hold() takes its locks in, and the items are updated in one
+    statement.
+    """
+    with write_transaction():
+        lines = CartItem.objects.select_for_update(skip_locked=expired_before is not None).filter(
+            pk__in=cart_item_ids, held_quantity__gt=0
+        )
+        if expired_before is not None:
+            lines = lines.filter(added_at__lt=expired_before)
+        rows = list(lines.order_by('pk').values_list('id', 'item_id', 'held_quantity'))
+        if not rows:
+            return 0
+        CartItem.objects.filter(pk__in=[line_id for line_id, _, _ in rows]).update(held_quantity=0)
+        released = Counter()
+        for _, item_id, held in rows:
+            released[item_id] += held
+        lock_items(released)
+        Item.objects.filter(pk__in=released).update(
+            held_quantity=F('held_quantity') - per_item(released), updated_at=timezone.now()
+        )
+        invalidate(released)
+        return len(rows)
+
+
+def release_expired(batch_size=500):
+    """
+    Release every hold older than CART_HOLD_TTL, one short transaction per batch.
+
+    Batches walk the partial (added_at) index of holding lines, so a sweep
+    never scans or locks the rest of the table, and lines another
+    transaction has locked (being checked out or re-added) are skipped.
+    """
+    cutoff = hold_expiry()
+    total = 0
+    while True:
+        batch = list(
+            CartItem.objects.filter(held_quantity__gt=0, added_at__lt=cutoff)
+            .order_by('added_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return total
+        released = release(batch, expired_before=cutoff)
+        total += released
+        if not released:
+            return total
+
+
+def invalidate(item_ids):
+    """
+    Queryset updates skip the Item signals, so once the new stock or holds
+    are committed, invalidate every cached response that can show these
+    items, lists included (their in_stock filter and available_quantity).
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    def bump():
+        for item_id, seller_id, category in Item.objects.filter(pk__in=item_ids).values_list(
+                'id', 'seller_id', 'category'):
+            catalog_cache.bump_item(item_id, seller_id, category)
+
+    transaction.on_commit(bump)
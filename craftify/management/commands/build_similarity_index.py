@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from craftify.models.item_controller import Item
+
+
+class Command(BaseCommand):
+    help = "Embed every item image and publish a fresh visual similarity index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64)
+        parser.add_argument('--dim', type=int, default=getattr(settings, 'SIMILARITY_DIM', None),
+                            help="PCA dimensions to keep; 0 keeps the full backbone width")
+
+    def handle(self, *args, **options):
+        from craftify import similarity
+
+        started = timezone.now()
+        items = Item.objects.exclude(Q(image='') | Q(image__isnull=True)).order_by('pk')
+        rows = items.values_list('pk', 'image').iterator(chunk_size=2000)
+        count = similarity.rebuild(rows, items.count(), options['batch_size'], options['dim'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} item images."))
+
+        # Items whose image changed while the rebuild ran may have been embedded
+        # from the old file, or signalled before the new index existed.
+        changed = Item.objects.filter(updated_at__gte=started).values_list('pk', 'image')
+        for item_id, image in changed.iterator():
+            similarity.update(item_id, image or None)
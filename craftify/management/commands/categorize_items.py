@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from craftify import categorizer
+from craftify.models.item_controller import Item
+
+
+class Command(BaseCommand):
+    help = "Fill in missing item categories from their images, one batched forward pass per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64)
+        parser.add_argument('--seller', type=int, help="Only categorize this seller's items")
+
+    def handle(self, *args, **options):
+        import torch
+        from craftify import ml_utils
+
+        model = ml_utils.load_model()
+
+        def predict(tensors):
+            with torch.inference_mode():
+                return model(torch.stack(tensors)).argmax(dim=1).tolist()
+
+        items = (
+            Item.objects.exclude(Q(image='') | Q(image__isnull=True))
+            .filter(Q(category='') | Q(category__isnull=True))
+            .order_by('pk')
+        )
+        if options['seller']:
+            items = items.filter(seller_id=options['seller'])
+
+        # Walk by primary key so items that fail or keep no category are not revisited.
+        last_pk, scanned, updated = 0, 0, 0
+        while True:
+            rows = list(items.filter(pk__gt=last_pk).values_list('pk', 'image')[:options['batch_size']])
+            if not rows:
+                break
+            updated += categorizer.categorize(rows, predict)
+            scanned += len(rows)
+            last_pk = rows[-1][0]
+            self.stdout.write(f"{scanned} items scanned, {updated} categorized", ending='\r')
+        self.stdout.write(self.style.SUCCESS(f"Categorized {updated} of {scanned} items."))
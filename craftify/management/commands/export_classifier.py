@@ -0,0 +1,118 @@
+import copy
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from craftify import ml_utils
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the image classifier as TorchScript and int8 artifacts for CLASSIFIER_VARIANT, "
+        "checking each artifact's predictions against the fp32 eager model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variant', action='append', choices=sorted(ml_utils.VARIANTS),
+                            help="Variant to export; repeat for several (default: all)")
+        parser.add_argument('--weights', help="fp32 state dict (default: CLASSIFIER_MODEL_PATH)")
+        parser.add_argument('--untrained', action='store_true',
+                            help="Export randomly initialised weights, for benchmarking only")
+        parser.add_argument('--output-dir', help="Default: CLASSIFIER_ARTIFACT_DIR")
+        parser.add_argument('--samples-dir',
+                            help="Images used to calibrate static-int8 and to measure accuracy deltas; "
+                                 "random tensors are used without it")
+        parser.add_argument('--samples', type=int, default=64, help="Maximum number of sample images")
+        parser.add_argument('--min-agreement', type=float,
+                            help="Fail if a variant's top-1 agreement with eager is below this fraction")
+
+    def handle(self, *args, **options):
+        import torch
+
+        torch.manual_seed(0)
+        if options['untrained']:
+            model = ml_utils.build_model().eval()
+        else:
+            try:
+                model = ml_utils.load_eager_model(options['weights'])
+            except (OSError, RuntimeError) as exc:
+                raise CommandError(f"Could not load classifier weights: {exc}")
+
+        output_dir = options['output_dir'] or getattr(settings, 'CLASSIFIER_ARTIFACT_DIR', ml_utils.ARTIFACT_DIR)
+        os.makedirs(output_dir, exist_ok=True)
+        samples = self.load_samples(options['samples_dir'], options['samples'])
+        with torch.inference_mode():
+            reference = model(samples)
+
+        for variant in options['variant'] or sorted(ml_utils.VARIANTS):
+            path = os.path.join(output_dir, ml_utils.VARIANTS[variant])
+            exported = self.export(variant, model, samples)
+            temporary = path + '.tmp'
+            torch.jit.save(exported, temporary)
+
+            # Score the artifact as run_inference would load it, not the in-memory module.
+            loaded = torch.jit.load(temporary, map_location='cpu').eval()
+            with torch.inference_mode():
+                output = loaded(samples)
+            agreement = (output.argmax(dim=1) == reference.argmax(dim=1)).float().mean().item()
+            max_delta = (output - reference).abs().max().item()
+            size = os.path.getsize(temporary)
+
+            if options['min_agreement'] is not None and agreement < options['min_agreement']:
+                os.remove(temporary)
+                raise CommandError(
+                    f"{variant}: top-1 agreement {agreement:.1%} is below {options['min_agreement']:.1%}; "
+                    f"artifact not written"
+                )
+            os.replace(temporary, path)
+            self.stdout.write(
+                f"{variant:13} {size / 1e6:6.1f} MB  top-1 agreement {agreement:6.1%}  "
+                f"max logit delta {max_delta:.4f}  -> {path}"
+            )
+
+    def load_samples(self, samples_dir, limit):
+        import torch
+
+        if not samples_dir:
+            return torch.rand(limit, 3, ml_utils.INPUT_SIZE, ml_utils.INPUT_SIZE)
+        from PIL import Image
+
+        names = sorted(name for name in os.listdir(samples_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not names:
+            raise CommandError(f"No images found in {samples_dir}")
+        tensors = []
+        for name in names[:limit]:
+            with Image.open(os.path.join(samples_dir, name)) as image:
+                tensors.append(ml_utils.preprocess(image))
+        return torch.stack(tensors)
+
+    def export(self, variant, model, samples):
+        import torch
+
+        example = samples[:1]
+        if variant == 'torchscript':
+            module = model
+        elif variant == 'dynamic-int8':
+            # Only nn.Linear has a dynamic int8 kernel, which in ResNet-18 is the
+            # final fc layer; the convolutions stay fp32.
+            module = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            module = self.quantize_static(model, samples)
+        with torch.inference_mode():
+            traced = torch.jit.trace(module, example)
+        return torch.jit.freeze(traced.eval())
+
+    def quantize_static(self, model, samples):
+        """Post-training int8 quantization of every layer, calibrated on ``samples``."""
+        import torch
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        engine = ml_utils.quantized_engine()
+        torch.backends.quantized.engine = engine
+        prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping(engine), (samples[:1],))
+        with torch.inference_mode():
+            for batch in samples.split(16):
+                prepared(batch)
+        return convert_fx(prepared)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from craftify import exporter
+
+
+class Command(BaseCommand):
+    help = "Stream the catalog, or one seller's items, as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=exporter.FORMATS, default='csv')
+        parser.add_argument('--seller', type=int, help="Only export this seller's items")
+        parser.add_argument('--output', help="File to write; defaults to stdout")
+        parser.add_argument('--chunk-size', type=int, default=exporter.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        blocks = exporter.stream(options['format'], options['seller'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+                for block in blocks:
+                    handle.write(block)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending='')
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from craftify import importer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Bulk create or update a seller's items from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file with name, description, price, quantity, category")
+        parser.add_argument('--seller', required=True, help="Seller email or id")
+        parser.add_argument('--format', choices=importer.FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        seller_ref = options['seller']
+        lookup = {'pk': seller_ref} if seller_ref.isdigit() else {'email': seller_ref}
+        try:
+            seller = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"Seller {seller_ref} does not exist.")
+
+        fmt = options['format'] or importer.detect_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = importer.import_items(stream, fmt, seller, chunk_size=options['chunk_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, rejected {result.error_count} rows."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from craftify import idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = idempotency.prune(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} idempotency keys."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from craftify import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for every item in one bulk pass."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Full-text search requires the SQLite backend.")
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} items."))
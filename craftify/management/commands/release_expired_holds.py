@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from craftify import inventory
+
+
+class Command(BaseCommand):
+    help = "Return stock held by cart lines older than CART_HOLD_TTL, in short batched transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float,
+                            help="Keep sweeping every this many seconds instead of exiting")
+
+    def handle(self, *args, **options):
+        while True:
+            released = inventory.release_expired(options['batch_size'])
+            self.stdout.write(f"Released {released} expired cart holds.")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
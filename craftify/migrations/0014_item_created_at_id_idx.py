@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0013_item_category_item_image'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='item',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Item', 'verbose_name_plural': 'Items'},
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['created_at', 'id'], name='craftify_it_created_891d6e_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0014_item_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='craftify_it_seller__316553_idx',
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['seller', 'created_at'], name='craftify_it_seller__2093b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'price'], name='craftify_it_categor_e512b1_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_item_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS craftify_item_fts USING fts5("
+        "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO craftify_item_fts(rowid, name, description) "
+        "SELECT id, name, description FROM craftify_item"
+    )
+
+
+def drop_item_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS craftify_item_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0015_item_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_item_fts, drop_item_fts),
+    ]
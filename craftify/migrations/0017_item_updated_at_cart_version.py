@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0016_item_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text="Incremented whenever the cart's lines change"),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='userextended',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0017_item_updated_at_cart_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Source file and content hash of the generated thumbnails'),
+        ),
+        migrations.AddField(
+            model_name='userextended',
+            name='profile_picture_derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Source file and content hash of the generated thumbnails'),
+        ),
+    ]
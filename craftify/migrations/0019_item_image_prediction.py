@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0018_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='image_prediction',
+            field=models.JSONField(blank=True, default=dict, help_text='Source file, content hash and category predicted from the image'),
+        ),
+        migrations.CreateModel(
+            name='ImagePrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(help_text='SHA-256 of the image file', max_length=64)),
+                ('model', models.CharField(help_text='Classifier variant and version that made the prediction', max_length=50)),
+                ('category', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('digest', 'model'), name='unique_prediction_per_model')],
+            },
+        ),
+    ]
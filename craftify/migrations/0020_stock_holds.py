@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0019_item_image_prediction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='held_quantity',
+            field=models.PositiveIntegerField(default=0, help_text='Units of the item this line holds until added_at + CART_HOLD_TTL'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='held_quantity',
+            field=models.PositiveIntegerField(default=0, help_text='Units held by carts; kept in step with CartItem.held_quantity by craftify.inventory'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(condition=models.Q(('held_quantity__gt', 0)), fields=['added_at'], name='cartitem_hold_expiry'),
+        ),
+    ]
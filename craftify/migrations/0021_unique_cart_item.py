@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:21
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """Fold repeated (cart, item) lines into the oldest one so the constraint can be added."""
+    CartItem = apps.get_model('craftify', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('cart_id', 'item_id')
+        .annotate(lines=Count('id'), keep=Min('id'), quantity=Sum('quantity'), held=Sum('held_quantity'))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        lines = CartItem.objects.filter(cart_id=row['cart_id'], item_id=row['item_id'])
+        lines.exclude(pk=row['keep']).delete()
+        lines.filter(pk=row['keep']).update(quantity=row['quantity'], held_quantity=row['held'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0020_stock_holds'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'item'), name='unique_cart_item'),
+        ),
+    ]
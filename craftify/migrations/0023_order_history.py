@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0022_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchaseorderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0.01, help_text='Unit price when ordered', max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorderitem',
+            name='purchase_order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='craftify.purchaseorder'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['buyer', 'created_at'], name='craftify_pu_buyer_i_6dc1df_idx'),
+        ),
+    ]
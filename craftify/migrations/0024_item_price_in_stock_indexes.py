@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('craftify', '0023_order_history'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['price'], name='craftify_it_price_f507ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('quantity__gt', models.F('held_quantity'))), fields=['created_at', 'id'], name='item_in_stock_created'),
+        ),
+    ]
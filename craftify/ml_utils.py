@@ -1,18 +1,236 @@
-import torch
+import io
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+# torch and torchvision cost seconds and hundreds of MB per process, so they are
+# imported inside the functions that need them rather than with this module.
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'model.pth')
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ml_artifacts')
+NUM_CLASSES = 2
+FEATURES = 512  # width of ResNet-18's pooled penultimate layer
+INPUT_SIZE = 224
+
+# CLASSIFIER_VARIANT -> file written by `manage.py export_classifier`.
+# 'eager' loads the fp32 state dict into a Python ResNet-18 instead.
+VARIANTS = {
+    'torchscript': 'classifier.torchscript.pt',
+    'dynamic-int8': 'classifier.dynamic-int8.pt',
+    'static-int8': 'classifier.static-int8.pt',
+}
+
+
+def build_model():
+    """ResNet-18 with a NUM_CLASSES-way head and untrained weights."""
+    import torch
+    from torchvision import models
+
+    model = models.resnet18(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, NUM_CLASSES)
+    return model
+
+
+def load_eager_model(path=None):
+    import torch
+
+    model = build_model()
+    path = path or getattr(settings, 'CLASSIFIER_MODEL_PATH', MODEL_PATH)
+    model.load_state_dict(torch.load(path, map_location=torch.device('cpu'), weights_only=True))
+    model.eval()
+    return model
+
+
+def artifact_path(variant):
+    return os.path.join(getattr(settings, 'CLASSIFIER_ARTIFACT_DIR', ARTIFACT_DIR), VARIANTS[variant])
+
+
+def model_file(variant=None):
+    """Weights or artifact file that load_model() reads for ``variant``."""
+    variant = variant or getattr(settings, 'CLASSIFIER_VARIANT', 'eager')
+    if variant == 'eager':
+        return getattr(settings, 'CLASSIFIER_MODEL_PATH', MODEL_PATH)
+    return artifact_path(variant)
+
+
+def is_available(variant=None):
+    try:
+        return os.path.getsize(model_file(variant)) > 0
+    except (OSError, KeyError):
+        return False
+
+
+def load_model(variant=None):
+    """Load the classifier artifact selected by CLASSIFIER_VARIANT."""
+    import torch
+
+    variant = variant or getattr(settings, 'CLASSIFIER_VARIANT', 'eager')
+    if variant == 'eager':
+        return load_eager_model()
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown classifier variant {variant!r}")
+    if variant.endswith('int8'):
+        torch.backends.quantized.engine = quantized_engine()
+    model = torch.jit.load(artifact_path(variant), map_location='cpu')
+    model.eval()
+    return model
+
+
+def quantized_engine():
+    import torch
+
+    engines = torch.backends.quantized.supported_engines
+    return 'x86' if 'x86' in engines else 'qnnpack'
+
+
+def load_embedder(path=None):
+    """The classifier's backbone: FEATURES-d pooled penultimate activations per image."""
+    import torch
+
+    model = load_eager_model(path)
+    model.fc = torch.nn.Identity()
+    return model
+
+
+def preprocess(pil_image):
+    """(3, 224, 224) normalised tensor for one PIL image."""
+    from torchvision import transforms
+
+    transform = transforms.Compose([
+        transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+    return transform(pil_image.convert('RGB'))
+
+
+def image_tensor(data):
+    """preprocess() for encoded image bytes."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        return preprocess(image)
+
+
+class InferenceServer:
+    """
+    Groups concurrent inference requests into micro-batches.
+
+    Callers get a Future from submit(). A single daemon thread owns the model
+    (loaded on first use), waits up to ``max_wait`` seconds for up to
+    ``max_batch_size`` requests, and runs them as one forward pass, which
+    amortises per-call overhead across the batch on CPU.
+    """
+
+    def __init__(self, loader=load_model, max_batch_size=16, max_wait=0.005, num_threads=None):
+        self.loader = loader
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.num_threads = num_threads
+        self.requests = queue.Queue()
+        self.model = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, input_tensor):
+        """Queue one image tensor, shaped (3, H, W) or (1, 3, H, W)."""
+        if input_tensor.dim() == 4 and input_tensor.shape[0] == 1:
+            input_tensor = input_tensor.squeeze(0)
+        if input_tensor.dim() != 3 or input_tensor.shape[0] != 3:
+            raise ValueError(f"Expected an image tensor shaped (3, H, W), got {tuple(input_tensor.shape)}")
+        future = Future()
+        self.start()
+        self.requests.put((input_tensor, future))
+        return future
+
+    def start(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.serve, name='inference-server', daemon=True)
+                    self.thread.start()
+
+    def next_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def serve(self):
+        import torch
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        while True:
+            batch = [(tensor, future) for tensor, future in self.next_batch()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            tensors, futures = zip(*batch)
+            try:
+                if self.model is None:
+                    self.model = self.loader()
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            try:
+                predictions = self.predict(tensors)
+            except Exception as exc:
+                if len(batch) == 1:
+                    futures[0].set_exception(exc)
+                    continue
+                # Run the requests one by one so a bad input (e.g. an odd
+                # image size) only fails its own caller.
+                for tensor, future in batch:
+                    try:
+                        future.set_result(self.predict([tensor])[0])
+                    except Exception as exc:
+                        future.set_exception(exc)
+                continue
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+    def predict(self, tensors):
+        import torch
+
+        with torch.inference_mode():
+            output = self.model(torch.stack(tensors))
+        return output.argmax(dim=1).tolist()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server():
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _server = InferenceServer(
+                    max_batch_size=getattr(settings, 'CLASSIFIER_MAX_BATCH_SIZE', 16),
+                    max_wait=getattr(settings, 'CLASSIFIER_MAX_WAIT', 0.005),
+                    num_threads=getattr(settings, 'CLASSIFIER_TORCH_THREADS', None),
+                )
+    return _server
+
 
-from torchvision import models
-model = models.resnet18(pretrained=False)
-num_ftrs = model.fc.in_features
-model.fc = torch.nn.Linear(num_ftrs, 2)
+def submit_inference(input_tensor):
+    return get_server().submit(input_tensor)
 
-model.load_state_dict(torch.load(MODEL_PATH, map_location=torch.device('cpu')))
-model.eval()
 
 def run_inference(input_tensor):
-    with torch.no_grad():
-        output = model(input_tensor)
-        _, predicted = torch.max(output, 1)
-        return predicted.item()
\ No newline at end of file
+    """Predicted class index for one image tensor; blocks until its batch runs."""
+    return submit_inference(input_tensor).result()
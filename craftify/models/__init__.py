@@ -1,2 +1,3 @@
 from .user_ext_controller import UserExtended
-from .item_controller import Item, PurchaseOrder, PurchaseOrderItem, Review, ReturnOrder
\ No newline at end of file
+from .item_controller import Item, ImagePrediction, PurchaseOrder, PurchaseOrderItem, Review, ReturnOrder
+from .idempotency_controller import IdempotencyKey
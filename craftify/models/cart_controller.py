@@ -1,11 +1,37 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Sum, Value, Prefetch, ExpressionWrapper, DecimalField
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from craftify.models.item_controller import Item, PurchaseOrder, PurchaseOrderItem
+from craftify.models.item_controller import Item
 
 User = get_user_model()
 
+def line_total(prefix=''):
+    """price * quantity of a cart line, computed by the database."""
+    return ExpressionWrapper(
+        F(f'{prefix}item__price') * F(f'{prefix}quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+class CartQuerySet(models.QuerySet):
+    def with_lines(self):
+        """
+        Carts annotated with ``total`` and their lines prefetched with items,
+        sellers and ``line_total``: two queries however many lines there are.
+        """
+        return self.annotate(
+            total=Coalesce(Sum(line_total('items__')), Value(Decimal('0')), output_field=DecimalField())
+        ).prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.with_totals().select_related('item__seller'))
+        )
+
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        return self.annotate(line_total=line_total())
+
 class Cart(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -15,15 +41,25 @@ class Cart(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented whenever the cart's lines change"
+    )
+
+    objects = CartQuerySet.as_manager()
 
     def __str__(self):
         return f"Cart of {self.user.username}"
 
+    @classmethod
+    def touch(cls, cart_id):
+        """Record a change to the cart's lines without loading the cart."""
+        cls.objects.filter(pk=cart_id).update(version=F('version') + 1, updated_at=timezone.now())
+
     def add_item(self, item, quantity=1):
-        cart_item, created = CartItem.objects.get_or_create(cart=self, item=item)
-        if not created:
-            cart_item.quantity += quantity
-        cart_item.save()
+        from craftify import carts
+
+        return carts.add(self.pk, item.pk, quantity)
 
     def remove_item(self, item):
         cart_item = CartItem.objects.filter(cart=self, item=item).first()
@@ -34,41 +70,47 @@ class Cart(models.Model):
         self.items.all().delete()
 
     def get_total_price(self):
-        return sum(item.get_total_price() for item in self.items.all())
+        if hasattr(self, 'total'):
+            return self.total
+        return self.items.aggregate(total=Sum(line_total()))['total'] or Decimal('0')
 
     def process_to_purchase_order(self):
-        if not self.items.exists():
-          return None
-
-        purchase_order = PurchaseOrder.objects.create(
-          seller=self.items.first().item.seller,
-           buyer=self.user
-       )
-
-        total_amount = 0
-        for cart_item in self.items.all():
-            po_item = PurchaseOrderItem.objects.create(
-            purchase_order=purchase_order,
-            item=cart_item.item,
-            quantity=cart_item.quantity,
-            price=cart_item.item.price * cart_item.quantity
-        )
-        total_amount += po_item.price
+        """
+        Turn the cart into purchase orders, one per seller, taking the units
+        out of stock. See orders.place_orders().
 
-        purchase_order.total_amount = total_amount
-        purchase_order.save()
+        Raises inventory.InsufficientStock, leaving the cart and stock
+        untouched, if any line asks for more than is left.
+        """
+        from craftify import orders
 
-        self.clear_cart()
-        return purchase_order
+        return orders.place_orders(self)
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(default=timezone.now)  # Ensure this field exists
+    held_quantity = models.PositiveIntegerField(
+        default=0,
+        help_text="Units of the item this line holds until added_at + CART_HOLD_TTL"
+    )
+
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'item'], name='unique_cart_item'),
+        ]
+        indexes = [
+            # Only holding lines are indexed, so the expiry sweep stays cheap on large carts tables.
+            models.Index(fields=['added_at'], condition=models.Q(held_quantity__gt=0), name='cartitem_hold_expiry'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.item.name}"
 
     def get_total_price(self):
+        if hasattr(self, 'line_total'):
+            return self.line_total
         return self.item.price * self.quantity
\ No newline at end of file
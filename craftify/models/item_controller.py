@@ -30,41 +30,112 @@ class Item(models.Model):
             MinValueValidator(1)
         ]
     )
+    held_quantity = models.PositiveIntegerField(
+        default=0,
+        help_text="Units held by carts; kept in step with CartItem.held_quantity by craftify.inventory"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='items_for_sale')
     image = models.ImageField(upload_to='item_images/', null=True, blank=True)
+    image_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Source file and content hash of the generated thumbnails"
+    )
     category = models.CharField(max_length=100, null=True, blank=True)
+    image_prediction = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Source file, content hash and category predicted from the image"
+    )
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name = "Item"
         verbose_name_plural = "Items"
         indexes = [
-            models.Index(fields=['seller']),
+            models.Index(fields=['seller', 'created_at']),
             models.Index(fields=['name']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['category', 'price']),
+            models.Index(fields=['price']),
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(quantity__gt=models.F('held_quantity')),
+                name='item_in_stock_created',
+            ),
         ]
         unique_together = ('seller', 'name')
 
     def __str__(self):
         return f'{self.name} by {self.seller.username}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        item.remember_stored_state()
+        return item
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_stored_state()
+
+    def remember_stored_state(self):
+        """
+        Note the category and image as they are in the database, so the save
+        signals can tell what changed without querying for the old row.
+        Deferred fields are left alone rather than loaded.
+        """
+        if 'category' in self.__dict__:
+            self._previous_category = self.category
+        if 'image' in self.__dict__:
+            self._previous_image = self.image.name or None
+
+    @property
+    def available_quantity(self):
+        """Units that can still be added to a cart or checked out."""
+        return max(self.quantity - self.held_quantity, 0)
+
+class ImagePrediction(models.Model):
+    digest = models.CharField(max_length=64, help_text="SHA-256 of the image file")
+    model = models.CharField(max_length=50, help_text="Classifier variant and version that made the prediction")
+    category = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['digest', 'model'], name='unique_prediction_per_model'),
+        ]
+
+    def __str__(self):
+        return f'{self.digest[:12]} -> {self.category}'
+
 class PurchaseOrder(models.Model):
     seller = models.ForeignKey(User, related_name='sales', on_delete=models.CASCADE)
     buyer = models.ForeignKey(User, related_name='purchases', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['buyer', 'created_at']),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} from {self.seller} to {self.buyer}"
 
 class PurchaseOrderItem(models.Model):
-    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE)
+    purchase_order = models.ForeignKey(PurchaseOrder, related_name='items', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
-    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.01)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.01, help_text="Unit price when ordered")
 
     def __str__(self):
-        return f"{self.quantity} x {self.item.name}" 
+        return f"{self.quantity} x {self.item.name}"
+
+    def get_total_price(self):
+        return self.price * self.quantity
 
 class Review(models.Model):
     user = models.ForeignKey(
@@ -35,10 +35,16 @@ class UserExtended(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     date_of_birth = models.DateField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+    profile_picture_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Source file and content hash of the generated thumbnails"
+    )
     website = models.URLField(blank=True)
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     is_superuser = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     objects = UserExtendedManager()
 
@@ -0,0 +1,47 @@
+from collections import defaultdict
+from craftify import carts, inventory
+from craftify.models.cart_controller import Cart
+from craftify.models.item_controller import PurchaseOrder, PurchaseOrderItem
+
+
+def place_orders(cart):
+    """
+    Check out a cart: one PurchaseOrder per seller, the units taken out of
+    stock and the cart emptied, all in one transaction.
+
+    Lines are read once with their totals computed by the database, orders
+    and order items are written with one bulk insert each and the cart is
+    emptied with one DELETE, so the number of queries does not depend on
+    the size of the cart. Each order's PurchaseOrderItems (price is the unit
+    price) are set on it as ``lines``. Raises inventory.InsufficientStock,
+    leaving the cart and stock untouched, if any line asks for more than is
+    left; returns [] for an empty cart.
+    """
+    carts.flush(cart.pk)
+    with inventory.write_transaction():
+        cart_items = list(cart.items.with_totals().select_related('item__seller').order_by('pk'))
+        if not cart_items:
+            return []
+        inventory.reserve_cart(cart_items)
+
+        by_seller = defaultdict(list)
+        for cart_item in cart_items:
+            by_seller[cart_item.item.seller_id].append(cart_item)
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(seller_id=seller_id, buyer_id=cart.user_id,
+                          total_amount=sum(cart_item.line_total for cart_item in lines))
+            for seller_id, lines in by_seller.items()
+        ])
+        order_items = []
+        for order, lines in zip(orders, by_seller.values()):
+            order.lines = [
+                PurchaseOrderItem(purchase_order=order, item=cart_item.item,
+                                  quantity=cart_item.quantity, price=cart_item.item.price)
+                for cart_item in lines
+            ]
+            order_items += order.lines
+        PurchaseOrderItem.objects.bulk_create(order_items)
+
+        carts.delete_lines([cart_item.pk for cart_item in cart_items])
+        Cart.touch(cart.pk)
+    return orders
@@ -0,0 +1,104 @@
+import re
+from django.db import connection
+from django.utils.html import escape
+
+FTS_TABLE = 'craftify_item_fts'
+ITEM_TABLE = 'craftify_item'
+
+# Control characters that never appear in user text; snippet() wraps matches
+# in them so the text can be HTML-escaped before the <mark> tags go in.
+MARK_OPEN = '\x02'
+MARK_CLOSE = '\x03'
+
+# bm25() column weights: a hit in the name outranks one in the description.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def index_item(item):
+    index_items([item])
+
+
+def index_items(items):
+    """(Re-)index a batch of saved items with two executemany calls."""
+    if not is_supported() or not items:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[item.pk] for item in items])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+            [[item.pk, item.name, item.description] for item in items]
+        )
+
+
+def remove_item(item_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [item_id])
+
+
+def rebuild_index():
+    """Re-index the whole catalog in two set-based statements, then merge segments."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+            f"SELECT id, name, description FROM {ITEM_TABLE}"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word must match (implicit AND) and the last word also matches as a
+    prefix, so "ceram mu" finds "ceramic mug". Quoting each token keeps FTS5
+    operators in user input from being interpreted.
+    """
+    tokens = TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(fragment):
+    return escape(fragment).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def search(text, limit, offset=0):
+    """
+    Return [(item_id, name_highlight, description_snippet)] best match first.
+
+    Ranking and snippets come straight from the FTS index, so the cost depends
+    on how many rows match, not on the size of the catalog.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    if not is_supported():
+        from craftify.models.item_controller import Item
+        rows = Item.objects.filter(name__icontains=text).values_list('id', 'name', 'description')
+        return [(pk, escape(name), escape(description[:200])) for pk, name, description in rows[offset:offset + limit]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, "
+            f"highlight({FTS_TABLE}, 0, %s, %s), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', 16) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s OFFSET %s",
+            [MARK_OPEN, MARK_CLOSE, MARK_OPEN, MARK_CLOSE, match,
+             NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+        )
+        return [(row[0], highlight(row[1]), highlight(row[2])) for row in cursor.fetchall()]
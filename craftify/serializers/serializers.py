@@ -4,10 +4,25 @@ from django.contrib.auth import get_user_model
 from craftify.models.item_controller import Item, PurchaseOrder, PurchaseOrderItem
 from craftify.models.address_controller import Address
 from craftify.models.cart_controller import Cart, CartItem
+from craftify.images import image_urls
 
 User = get_user_model()
 
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    Takes an optional `fields` argument naming the subset of fields to
+    render, so list views can serve sparse fieldsets (?fields=id,name).
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_picture_urls = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = [
@@ -19,13 +34,17 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'country_code',
             'address',
             'bio',
-            'profile_picture'
+            'profile_picture',
+            'profile_picture_urls'
         ]
         read_only_fields = ['id']
         extra_kwargs = {
             'password': {'write_only': True}
         }
 
+    def get_profile_picture_urls(self, obj):
+        return image_urls(obj.profile_picture, obj.profile_picture_derivatives, self.context.get('request'))
+
     def create(self, validated_data):
         password = validated_data.pop('password', None)
         instance = self.Meta.model(**validated_data)
@@ -43,15 +62,20 @@ class UserProfileSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(DynamicFieldsModelSerializer):
     seller_username = serializers.ReadOnlyField(source='seller.username')
+    image_urls = serializers.SerializerMethodField()
+    available_quantity = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Item
-        fields = ['id', 'name', 'description', 'price', 'quantity', 
-                 'seller', 'seller_username', 'image', 'category', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'quantity', 'available_quantity',
+                 'seller', 'seller_username', 'image', 'image_urls', 'category', 'created_at']
         read_only_fields = ['id', 'seller', 'seller_username', 'created_at']
 
+    def get_image_urls(self, obj):
+        return image_urls(obj.image, obj.image_derivatives, self.context.get('request'))
+
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
@@ -70,6 +94,14 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['item', 'quantity', 'total_price']
 
+# Most units of one item a cart line may ask for.
+MAX_LINE_QUANTITY = 1000
+
+class CartLineSerializer(serializers.Serializer):
+    """One operation of a batch cart update: set the item's quantity, 0 to remove it."""
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=MAX_LINE_QUANTITY)
+
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(
@@ -86,6 +118,7 @@ class CartSerializer(serializers.ModelSerializer):
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
     item_id = serializers.IntegerField(write_only=True)
+    name = serializers.ReadOnlyField(source='item.name')
     total_price = serializers.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -95,7 +128,7 @@ class PurchaseOrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PurchaseOrderItem
-        fields = ['id', 'item', 'item_id', 'quantity', 'total_price']
+        fields = ['id', 'item', 'item_id', 'name', 'quantity', 'price', 'total_price']
 
     def validate_quantity(self, value):
         if value <= 0:
@@ -104,19 +137,12 @@ class PurchaseOrderItemSerializer(serializers.ModelSerializer):
 
 class PurchaseOrderSerializer(serializers.ModelSerializer):
     items = PurchaseOrderItemSerializer(many=True, read_only=True)
-    total_amount = serializers.DecimalField(
-        max_digits=10,
-        decimal_places=2,
-        read_only=True,
-        source='get_total_amount'
-    )
     buyer = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    status = serializers.CharField(read_only=True)
 
     class Meta:
         model = PurchaseOrder
-        fields = ['id', 'buyer', 'items', 'total_amount', 'status', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'buyer', 'seller', 'items', 'total_amount', 'created_at']
+        read_only_fields = ['id', 'seller', 'total_amount', 'created_at']
 
     def create(self, validated_data):
         items_data = self.context.get('items', [])
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -44,9 +45,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
 ]
 
+# Development-only apps, left out by craftify.settings_production.
+DEV_APPS = ['django_seed']
+
 AUTH_USER_MODEL = 'craftify.UserExtended'
 
 MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Thumbnails are resized in a pool of worker processes after upload. Set
+# IMAGE_DERIVATIVES_SYNC to resize inline instead (tests, management shells).
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVES_SYNC = False
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -88,6 +98,73 @@ SIMPLE_JWT = {
     'AUTH_COOKIE_SAMESITE': 'Lax',
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache alias for item list/detail responses and their version counters.
+# Local memory is per process; point this at a shared backend (Redis,
+# Memcached) when running several workers so invalidations reach all of them.
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_CACHE_LOCK_WAIT = 2.0
+
+# Seconds before a worker rebuilds its in-memory autocomplete index to pick up
+# item changes made by other processes.
+AUTOCOMPLETE_MAX_AGE = 300
+
+# Image classifier (craftify.ml_utils). Concurrent requests are grouped into
+# batches of up to CLASSIFIER_MAX_BATCH_SIZE, waiting at most CLASSIFIER_MAX_WAIT
+# seconds; CLASSIFIER_TORCH_THREADS caps torch's intra-op threads (None = torch default).
+CLASSIFIER_MODEL_PATH = os.path.join(BASE_DIR, 'craftify', 'model.pth')
+# 'eager' (fp32 state dict above) or an artifact from `manage.py export_classifier`:
+# 'torchscript', 'dynamic-int8' or 'static-int8', read from CLASSIFIER_ARTIFACT_DIR
+# (generated files, kept out of git).
+CLASSIFIER_VARIANT = 'eager'
+CLASSIFIER_ARTIFACT_DIR = os.path.join(BASE_DIR, 'ml_artifacts')
+CLASSIFIER_MAX_BATCH_SIZE = 16
+CLASSIFIER_MAX_WAIT = 0.005
+CLASSIFIER_TORCH_THREADS = None
+# Category written to an item for each classifier output index. Predictions are
+# cached by image hash per variant and CLASSIFIER_MODEL_VERSION; bump the version
+# when deploying new weights. CATEGORIZER_WORKERS threads read and decode images
+# for the classifier; CATEGORIZER_SYNC categorizes inline on save (tests).
+CLASSIFIER_CATEGORIES = ['Class A', 'Class B']
+CLASSIFIER_MODEL_VERSION = 1
+CATEGORIZER_WORKERS = 4
+CATEGORIZER_SYNC = False
+
+# Visual similarity index (craftify.similarity), built by
+# `manage.py build_similarity_index` and memory-mapped by every worker.
+# Embeddings are PCA-reduced to SIMILARITY_DIM dimensions (None keeps all 512)
+# and stored as float16. SIMILARITY_SYNC applies item updates inline (tests).
+SIMILARITY_INDEX_DIR = os.path.join(BASE_DIR, 'similarity_index')
+SIMILARITY_DIM = 128
+SIMILARITY_SYNC = False
+
+# Seconds a cart line holds its units after it was last added to. Expired holds
+# are returned by `manage.py release_expired_holds` (run it from cron, or with
+# --interval as a long-running process).
+CART_HOLD_TTL = 900
+
+# Carts of visitors who are not signed in live in this cache alias for
+# GUEST_CART_TIMEOUT seconds and are merged into the user's cart on login.
+# Like the catalog cache, use a shared backend when running several workers.
+CART_CACHE_ALIAS = 'default'
+GUEST_CART_TIMEOUT = 7 * 24 * 3600
+# Seconds to collect a signed-in user's API add-to-cart calls before writing
+# them as one upsert (0 writes each at once). Pending adds wait in
+# CART_CACHE_ALIAS, which must be shared by all workers (Redis, Memcached),
+# and are flushed before any worker reads or checks out the cart.
+CART_WRITE_BEHIND = 0
+
+# Seconds a checkout response is kept for replay to clients retrying with the
+# same Idempotency-Key header. Run `manage.py prune_idempotency_keys`
+# periodically to delete older records.
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+
 ROOT_URLCONF = 'craftify.urls'
 
 TEMPLATES = [
@@ -116,6 +193,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Writers wait up to 20 s for SQLite's write lock. Stock changes take it
+        # at BEGIN (inventory.write_transaction) so concurrent checkouts queue.
+        'OPTIONS': {'timeout': 20},
+        # A file rather than the shared in-memory default, which has no lock
+        # waiting, so threaded tests see the same locking as a real server.
+        # Named per run so concurrent test runs on one host do not collide.
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), f'craftify_test_{os.getpid()}.sqlite3')},
     }
 }
 
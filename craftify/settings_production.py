@@ -0,0 +1,21 @@
+"""
+Production settings for craftify.
+
+Extends the development settings, drops DEV_APPS and reads secrets and hosts
+from the environment:
+
+    DJANGO_SETTINGS_MODULE=craftify.settings_production
+    DJANGO_SECRET_KEY=...  DJANGO_ALLOWED_HOSTS=craftify.example.com
+"""
+import os
+
+from craftify.settings import *  # noqa: F401,F403
+from craftify.settings import DEV_APPS, INSTALLED_APPS
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.contrib.auth.signals import user_logged_in
+from craftify.models.item_controller import Item
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import search, autocomplete, catalog_cache, images, categorizer, inventory, guest_carts
+
+@receiver(post_save, sender=Item)
+def index_item_for_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_item(instance)
+
+@receiver(post_delete, sender=Item)
+def remove_item_from_search(sender, instance, **kwargs):
+    search.remove_item(instance.pk)
+
+@receiver(post_save, sender=Item)
+def update_autocomplete_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.item_saved(instance))
+
+@receiver(post_delete, sender=Item)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.item_deleted(item_id))
+
+@receiver(post_save, sender=Item)
+def invalidate_cached_item_on_save(sender, instance, **kwargs):
+    # Item.remember_stored_state() keeps the category the row had before this save.
+    scope = (instance.pk, instance.seller_id, instance.category,
+             getattr(instance, '_previous_category', instance.category))
+    transaction.on_commit(lambda: catalog_cache.bump_item(*scope))
+
+@receiver(post_delete, sender=Item)
+def invalidate_cached_item_on_delete(sender, instance, **kwargs):
+    scope = (instance.pk, instance.seller_id, instance.category)
+    transaction.on_commit(lambda: catalog_cache.bump_item(*scope))
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def touch_cart(sender, instance, **kwargs):
+    Cart.touch(instance.cart_id)
+
+@receiver(pre_delete, sender=CartItem)
+def release_cart_item_hold(sender, instance, **kwargs):
+    if instance.held_quantity:
+        inventory.release([instance.pk])
+
+@receiver(post_save, sender=Item)
+def build_item_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    scopes = [
+        catalog_cache.ALL,
+        catalog_cache.item_scope(instance.pk),
+        catalog_cache.seller_scope(instance.seller_id),
+        catalog_cache.category_scope(instance.category),
+    ]
+    transaction.on_commit(lambda: images.schedule(instance, 'image', 'image_derivatives', scopes))
+
+@receiver(post_save, sender=Item)
+def categorize_item_image(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    transaction.on_commit(lambda: categorizer.schedule(instance))
+
+@receiver(post_save, sender=Item)
+def update_item_embedding(sender, instance, created, raw=False, **kwargs):
+    image = instance.image.name or None
+    if raw or (created and not image):
+        return
+    if not created and (getattr(instance, '_previous_image', None) or None) == image:
+        return
+    # Imported here: similarity loads numpy and torch.
+    from craftify import similarity
+
+    item_id = instance.pk
+    transaction.on_commit(lambda: similarity.schedule(item_id, image))
+
+@receiver(post_delete, sender=Item)
+def remove_item_embedding(sender, instance, **kwargs):
+    from craftify import similarity
+
+    item_id = instance.pk
+    transaction.on_commit(lambda: similarity.schedule(item_id, None))
+
+# Registered after every other Item post_save receiver, which still need the
+# values from before the save.
+@receiver(post_save, sender=Item)
+def remember_saved_item_state(sender, instance, **kwargs):
+    instance.remember_stored_state()
+
+@receiver(post_save, sender=UserExtended)
+def build_profile_picture_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or not instance.profile_picture:
+        return
+    transaction.on_commit(
+        lambda: images.schedule(instance, 'profile_picture', 'profile_picture_derivatives')
+    )
+
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        guest_carts.merge(request, user)
@@ -0,0 +1,394 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+META = 'meta.json'
+LOCK = '.lock'
+VECTOR_DTYPE = np.float16
+ID_DTYPE = np.int64
+
+# Embeddings sampled to fit the PCA projection on a full rebuild.
+PROJECTION_SAMPLE = 20000
+MIN_CAPACITY = 1024
+
+
+def index_dir():
+    return getattr(settings, 'SIMILARITY_INDEX_DIR', os.path.join(settings.BASE_DIR, 'similarity_index'))
+
+
+def read_meta(directory):
+    try:
+        with open(os.path.join(directory, META)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def write_meta(directory, meta):
+    temporary = os.path.join(directory, f'{META}.{uuid.uuid4().hex}')
+    with open(temporary, 'w') as handle:
+        json.dump(meta, handle)
+    os.replace(temporary, os.path.join(directory, META))
+
+
+def generation_path(directory, generation, kind):
+    return os.path.join(directory, f'{kind}-{generation}.bin')
+
+
+@contextlib.contextmanager
+def locked(directory):
+    """Serialise writers across processes; readers never take the lock."""
+    import fcntl
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK), 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class Projection:
+    """
+    Maps FEATURES-d backbone activations to unit-length ``dim``-d vectors.
+
+    With ``components`` the activations are centred and projected onto their
+    top principal components, which shrinks the matrix every query has to
+    scan; without them they are only normalised. Cosine similarity is then a
+    plain dot product.
+    """
+
+    def __init__(self, mean=None, components=None):
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, sample, dim):
+        sample = np.asarray(sample, dtype=np.float32)
+        if dim is None or dim >= sample.shape[1] or len(sample) <= dim:
+            return cls()
+        mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        return cls(mean, np.ascontiguousarray(vt[:dim].T))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if 'components' not in data:
+                return cls()
+            return cls(data['mean'], data['components'])
+
+    def save(self, path):
+        with open(path, 'wb') as handle:
+            if self.components is None:
+                np.savez(handle)
+            else:
+                np.savez(handle, mean=self.mean, components=self.components)
+
+    def apply(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        if self.components is not None:
+            features = (features - self.mean) @ self.components
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return (features / np.maximum(norms, 1e-12)).astype(VECTOR_DTYPE)
+
+
+def write_generation(directory, ids, vectors, projection):
+    """Publish a complete index; readers switch to it on their next query."""
+    ids = np.asarray(ids, dtype=ID_DTYPE)
+    count, dim = len(ids), vectors.shape[1]
+    capacity = max(MIN_CAPACITY, count)
+    generation = uuid.uuid4().hex[:12]
+    os.makedirs(directory, exist_ok=True)
+
+    stored = np.memmap(generation_path(directory, generation, 'vectors'), VECTOR_DTYPE, 'w+', shape=(capacity, dim))
+    stored[:count] = vectors
+    stored.flush()
+    stored_ids = np.memmap(generation_path(directory, generation, 'ids'), ID_DTYPE, 'w+', shape=(capacity,))
+    stored_ids[:count] = ids
+    stored_ids.flush()
+    del stored, stored_ids
+    projection.save(generation_path(directory, generation, 'projection'))
+
+    with locked(directory):
+        previous = read_meta(directory)
+        write_meta(directory, {'generation': generation, 'dim': dim, 'count': count, 'capacity': capacity})
+    # Workers still mapping the old files keep them alive until they switch over.
+    if previous:
+        for kind in ('vectors', 'ids', 'projection'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(generation_path(directory, previous['generation'], kind))
+    return count
+
+
+def open_writable(directory, meta):
+    shape = (meta['capacity'], meta['dim'])
+    vectors = np.memmap(generation_path(directory, meta['generation'], 'vectors'), VECTOR_DTYPE, 'r+', shape=shape)
+    ids = np.memmap(generation_path(directory, meta['generation'], 'ids'), ID_DTYPE, 'r+', shape=(meta['capacity'],))
+    return vectors, ids
+
+
+def grow(directory, meta):
+    """Double the preallocated rows in place; the new tail reads as zeros."""
+    capacity = meta['capacity'] * 2
+    for kind, row_bytes in (('vectors', meta['dim'] * np.dtype(VECTOR_DTYPE).itemsize),
+                            ('ids', np.dtype(ID_DTYPE).itemsize)):
+        with open(generation_path(directory, meta['generation'], kind), 'r+b') as handle:
+            handle.truncate(capacity * row_bytes)
+    meta['capacity'] = capacity
+
+
+def upsert(item_id, features):
+    """Add or replace one item's embedding. Returns False when no index has been built."""
+    directory = index_dir()
+    with locked(directory):
+        meta = read_meta(directory)
+        if meta is None:
+            return False
+        projection = Projection.load(generation_path(directory, meta['generation'], 'projection'))
+        vector = projection.apply(np.asarray(features)[None])[0]
+        vectors, ids = open_writable(directory, meta)
+        rows = np.flatnonzero(ids[:meta['count']] == item_id)
+        if not len(rows):
+            # Reuse a slot freed by remove() before appending.
+            rows = np.flatnonzero(ids[:meta['count']] == 0)
+        appended = not len(rows)
+        if appended:
+            row = meta['count']
+            if row == meta['capacity']:
+                grow(directory, meta)
+                vectors, ids = open_writable(directory, meta)
+            meta['count'] += 1
+        else:
+            row = int(rows[0])
+        # Vector before id, so a reader that sees the id also sees its vector.
+        vectors[row] = vector
+        vectors.flush()
+        ids[row] = item_id
+        ids.flush()
+        if appended:
+            # Readers only scan the first ``count`` rows, so this publishes the row.
+            write_meta(directory, meta)
+    return True
+
+
+def remove(item_id):
+    directory = index_dir()
+    with locked(directory):
+        meta = read_meta(directory)
+        if meta is None:
+            return
+        vectors, ids = open_writable(directory, meta)
+        for row in np.flatnonzero(ids[:meta['count']] == item_id):
+            ids[row] = 0
+            vectors[row] = 0
+        ids.flush()
+        vectors.flush()
+
+
+class Index:
+    """
+    Read-only view of the published index, memory-mapped from disk.
+
+    Every worker maps the same files, so the matrix sits in the page cache
+    once per host. Rows are unit vectors, so one float16 matrix-vector
+    product scores the whole catalog.
+    """
+
+    def __init__(self, directory, meta, stamp):
+        self.meta = meta
+        self.stamp = stamp
+        self.ids = np.memmap(generation_path(directory, meta['generation'], 'ids'), ID_DTYPE, 'r',
+                             shape=(meta['capacity'],))
+        vectors = np.memmap(generation_path(directory, meta['generation'], 'vectors'), VECTOR_DTYPE, 'r',
+                            shape=(meta['capacity'], meta['dim']))
+        with warnings.catch_warnings():
+            # The tensors only ever read the shared, read-only mapping.
+            warnings.simplefilter('ignore', UserWarning)
+            self.matrix = torch.from_numpy(vectors)
+            self.id_tensor = torch.from_numpy(self.ids)
+
+    def similar(self, item_id, limit):
+        """[(item_id, cosine similarity)] best first, or None if ``item_id`` is not indexed."""
+        count = self.meta['count']
+        rows = np.flatnonzero(self.ids[:count] == item_id)
+        if not len(rows):
+            return None
+        row = int(rows[0])
+        matrix = self.matrix[:count]
+        scores = matrix @ matrix[row]
+        scores.masked_fill_(self.id_tensor[:count] == 0, float('-inf'))
+        scores[row] = float('-inf')
+        values, positions = torch.topk(scores, min(limit, count))
+        return [
+            (int(self.ids[position]), round(float(value), 4))
+            for value, position in zip(values.tolist(), positions.tolist())
+            if value != float('-inf')
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The worker's mapping of the current index, reopened when meta.json changes."""
+    global _index
+    directory = index_dir()
+    try:
+        # meta.json is replaced, never rewritten, so a new inode means a new index state.
+        stat = os.stat(os.path.join(directory, META))
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    index = _index
+    if index is None or index.stamp != stamp:
+        with _index_lock:
+            if _index is None or _index.stamp != stamp:
+                _index = Index(directory, read_meta(directory), stamp)
+            index = _index
+    return index
+
+
+def similar(item_id, limit=10):
+    index = get_index()
+    if index is None:
+        return None
+    return index.similar(item_id, limit)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def embed(tensors):
+    """Backbone features, (len(tensors), FEATURES) float32, for preprocessed images."""
+    global _embedder
+    from craftify import ml_utils
+
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = ml_utils.load_embedder()
+    with torch.inference_mode():
+        return _embedder(torch.stack(tensors)).numpy()
+
+
+def read_images(rows):
+    """Yield (item_id, tensor) for [(item_id, image_name)], skipping missing files."""
+    from craftify import ml_utils
+
+    for item_id, source in rows:
+        try:
+            with default_storage.open(source, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            logger.warning("Image %s for item %s is missing; not embedding", source, item_id)
+            continue
+        yield item_id, ml_utils.image_tensor(data)
+
+
+def update(item_id, source):
+    """Re-embed one item's image, or drop it from the index when it has none."""
+    loaded = list(read_images([(item_id, source)])) if source else []
+    if not loaded:
+        remove(item_id)
+        return
+    upsert(item_id, embed([loaded[0][1]])[0])
+
+
+def rebuild(rows, total, batch_size=64, dim=None):
+    """
+    Embed ``total`` items from ``rows`` [(item_id, image_name)] and publish a new index.
+
+    Backbone features are spooled to a temporary float16 file so memory
+    stays flat; a ``dim``-component projection (None keeps every feature)
+    is then fitted on a sample and applied in chunks.
+    """
+    directory = index_dir()
+    os.makedirs(directory, exist_ok=True)
+    spool_path = os.path.join(directory, f'spool-{uuid.uuid4().hex}.bin')
+    from craftify import ml_utils
+
+    spool = np.memmap(spool_path, VECTOR_DTYPE, 'w+', shape=(max(total, 1), ml_utils.FEATURES))
+    try:
+        ids = []
+        batch = []
+
+        def flush():
+            features = embed([tensor for _, tensor in batch])
+            spool[len(ids):len(ids) + len(batch)] = features
+            ids.extend(item_id for item_id, _ in batch)
+            batch.clear()
+
+        for item_id, tensor in read_images(rows):
+            if len(ids) + len(batch) == total:
+                break
+            batch.append((item_id, tensor))
+            if len(batch) == batch_size:
+                flush()
+        if batch:
+            flush()
+
+        count = len(ids)
+        sample = spool[np.sort(np.random.default_rng(0).permutation(count)[:PROJECTION_SAMPLE])]
+        projection = Projection.fit(sample, dim)
+        width = projection.components.shape[1] if projection.components is not None else ml_utils.FEATURES
+        vectors = np.empty((count, width), dtype=VECTOR_DTYPE)
+        for start in range(0, count, 8192):
+            vectors[start:start + 8192] = projection.apply(spool[start:start + 8192])
+        return write_generation(directory, ids, vectors, projection)
+    finally:
+        del spool
+        os.remove(spool_path)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # One thread per process keeps each item's updates in order.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similarity')
+    return _executor
+
+
+def schedule(item_id, source):
+    """
+    Queue an index update for one item (``source`` None removes it).
+
+    Nothing happens until `manage.py build_similarity_index` has published
+    an index and trained weights are deployed. SIMILARITY_SYNC runs the
+    update inline.
+    """
+    from craftify import ml_utils
+
+    if read_meta(index_dir()) is None or (source and not ml_utils.is_available('eager')):
+        return
+    if getattr(settings, 'SIMILARITY_SYNC', False):
+        update(item_id, source)
+    else:
+        get_executor().submit(run, item_id, source)
+
+
+def run(item_id, source):
+    try:
+        update(item_id, source)
+    except Exception:
+        logger.exception("Could not update the similarity index for item %s", item_id)
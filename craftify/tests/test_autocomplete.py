@@ -0,0 +1,125 @@
+import threading
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify.autocomplete import PrefixIndex
+from craftify import autocomplete
+
+class PrefixIndexTest(TestCase):
+    def setUp(self):
+        self.index = PrefixIndex.build(
+            [(1, "Ceramic Mug", "Pottery"), (2, "Ceramic Bowl", "Pottery"), (3, "Wool Scarf", "Textiles")],
+            popularity={2: 5, 3: 1},
+        )
+
+    def ids(self, prefix, **kwargs):
+        return [item_id for item_id, _, _ in self.index.lookup(prefix, **kwargs)]
+
+    def test_prefix_ranked_by_popularity(self):
+        self.assertEqual(self.ids("cer"), [2, 1])
+        self.assertEqual(self.ids("mu"), [1])
+        self.assertEqual(self.ids("pott"), [2, 1])
+        self.assertEqual(self.ids("Céramic b", fuzzy=False), [2])
+
+    def test_single_typo(self):
+        self.assertEqual(self.ids("cre"), [2, 1])
+        self.assertEqual(self.ids("scraf"), [3])
+        self.assertEqual(self.ids("scraf", fuzzy=False), [])
+        self.assertEqual(self.ids("sx"), [])
+
+    def test_incremental_updates(self):
+        self.index.add(4, "Scarf Ring", None)
+        self.assertEqual(self.ids("scarf"), [3, 4])
+        self.index.add(3, "Wool Hat", "Textiles")
+        self.assertEqual(self.ids("wool"), [3])
+        self.assertEqual(self.ids("sca", fuzzy=False), [4])
+        self.index.remove(3)
+        self.assertEqual(self.ids("tex"), [])
+
+    def test_updates_edit_entries_in_place(self):
+        entries = self.index.entries
+        self.index.add(4, "Scarf Ring", None)
+        self.index.add(2, "Ceramic Vase", "Pottery")
+        self.index.remove(1)
+        self.assertIs(self.index.entries, entries)
+        self.assertEqual(entries, sorted(entries))
+        self.assertEqual({item_id for _, item_id in entries}, {2, 3, 4})
+        self.assertNotIn(("bowl", 2), entries)
+
+class AutocompleteEndpointTest(APITestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.seller = UserExtended.objects.create_user(
+            email="seller@example.com", password="Password123!", username="seller"
+        )
+        Item.objects.create(name="Ceramic Mug", description="Mug", price=10, quantity=1,
+                            seller=self.seller, category="Pottery")
+
+    def tearDown(self):
+        autocomplete.reset()
+
+    def test_lazy_load_then_no_queries(self):
+        self.assertEqual(self.client.get('/api/items/autocomplete/?prefix=cer').data[0]['name'], "Ceramic Mug")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/items/autocomplete/?prefix=ceramik')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual([row['name'] for row in response.data], ["Ceramic Mug"])
+
+    def test_follows_item_changes(self):
+        self.client.get('/api/items/autocomplete/?prefix=cer')
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name="Linen Apron", description="Apron", price=20, quantity=1,
+                                seller=self.seller)
+        self.assertEqual([row['name'] for row in self.client.get('/api/items/autocomplete/?prefix=lin').data],
+                         ["Linen Apron"])
+
+class StaleIndexRebuildTest(TransactionTestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        Item.objects.create(name="Ceramic Mug", description="Mug", price=10, quantity=1, seller=self.seller)
+
+    def tearDown(self):
+        autocomplete.reset()
+
+    def test_serves_old_index_while_rebuilding(self):
+        stale = autocomplete.get_index()
+        Item.objects.filter(name="Ceramic Mug").update(name="Ceramic Cup")
+        stale.built_at -= 3600
+        with self.settings(AUTOCOMPLETE_MAX_AGE=60):
+            self.assertIs(autocomplete.get_index(), stale)
+            rebuild = autocomplete._rebuild
+            if rebuild is not None:
+                rebuild.join()
+            fresh = autocomplete.get_index()
+        self.assertIsNot(fresh, stale)
+        self.assertEqual([name for _, name, _ in fresh.lookup("cup")], ["Ceramic Cup"])
+        self.assertEqual([name for _, name, _ in stale.lookup("mug")], ["Ceramic Mug"])
+
+    def test_changes_during_rebuild_reach_new_index(self):
+        stale = autocomplete.get_index()
+        stale.built_at -= 3600
+        scanning, resume = threading.Event(), threading.Event()
+        load_index = autocomplete.load_index
+
+        def slow_load_index():
+            index = load_index()
+            scanning.set()
+            resume.wait(5)
+            return index
+
+        with mock.patch.object(autocomplete, 'load_index', slow_load_index):
+            autocomplete.get_index()
+            rebuild = autocomplete._rebuild
+            scanning.wait(5)
+            apron = Item.objects.create(name="Linen Apron", description="Apron", price=20, quantity=1,
+                                        seller=self.seller)
+            resume.set()
+            rebuild.join()
+        fresh = autocomplete.get_index()
+        self.assertIsNot(fresh, stale)
+        self.assertEqual([item_id for item_id, _, _ in fresh.lookup("linen")], [apron.id])
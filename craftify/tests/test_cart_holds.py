@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, PurchaseOrder
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import catalog_cache, inventory
+
+@override_settings(CART_HOLD_TTL=600)
+class CartHoldTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.item = Item.objects.create(name="Vase", description="d", price=12, quantity=3, seller=self.seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.rival = UserExtended.objects.create_user(email="rival@example.com", username="rival")
+
+    def add(self, user, quantity):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/cart/add/{self.item.id}/', {'quantity': quantity})
+
+    def test_adding_to_cart_holds_stock(self):
+        self.assertEqual(self.add(self.buyer, 2).status_code, 200)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.item.held_quantity, self.item.available_quantity), (3, 2, 1))
+        self.assertEqual(self.client.get(f'/api/items/{self.item.id}/').data['available_quantity'], 1)
+
+        response = self.add(self.rival, 2)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], 1)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.rival).exists())
+
+        # Adding more to an existing line only holds the difference.
+        self.assertEqual(self.add(self.buyer, 1).status_code, 200)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.held_quantity, 3)
+        self.assertEqual(self.add(self.rival, 1).status_code, 409)
+
+    def test_removing_a_line_releases_its_hold(self):
+        self.add(self.buyer, 2)
+        self.client.delete(f'/api/cart/remove_from_cart/{self.item.id}/')
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.held_quantity, 0)
+
+    def test_holds_invalidate_cached_lists(self):
+        catalog_cache.get_cache().clear()
+        in_stock = lambda: [row['id'] for row in self.client.get('/api/items/?in_stock=true').data['results']]
+        self.assertEqual(in_stock(), [self.item.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add(self.buyer, 3)
+        self.assertEqual(in_stock(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/cart/remove_from_cart/{self.item.id}/')
+        self.assertEqual(in_stock(), [self.item.id])
+
+    def test_sweep_releases_only_expired_holds(self):
+        self.add(self.buyer, 2)
+        self.add(self.rival, 1)
+        CartItem.objects.filter(cart__user=self.buyer).update(added_at=timezone.now() - timedelta(seconds=601))
+
+        output = StringIO()
+        call_command('release_expired_holds', '--batch-size', '1', stdout=output)
+        self.assertIn("Released 1 expired cart holds.", output.getvalue())
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.held_quantity, 1)
+        self.assertEqual(CartItem.objects.get(cart__user=self.buyer).held_quantity, 0)
+        self.assertEqual(inventory.release_expired(), 0)
+
+    def test_checkout_consumes_the_cart_hold(self):
+        self.add(self.buyer, 3)
+        orders = Cart.objects.get(user=self.buyer).process_to_purchase_order()
+        self.assertEqual(len(orders), 1)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.item.held_quantity), (0, 0))
+
+    def test_held_stock_is_not_sold_to_other_carts(self):
+        self.add(self.buyer, 2)
+        cart = Cart.objects.create(user=self.rival)
+        CartItem.objects.create(cart=cart, item=self.item, quantity=2)
+        with self.assertRaises(inventory.InsufficientStock) as raised:
+            cart.process_to_purchase_order()
+        self.assertEqual(raised.exception.shortages, {self.item.id: (2, 1)})
+        self.assertFalse(PurchaseOrder.objects.exists())
@@ -0,0 +1,150 @@
+import threading
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TransactionTestCase
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import carts, inventory
+
+class CartUpsertTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.item = Item.objects.create(name="Mug", description="d", price=5, quantity=10, seller=self.seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer", password="pw")
+        self.cart = Cart.objects.create(user=self.buyer)
+
+    def test_every_entry_point_adds_to_one_line(self):
+        self.cart.add_item(self.item, 2)
+        self.client.force_authenticate(self.buyer)
+        self.client.post(f'/api/items/{self.item.id}/add_to_cart/', {'quantity': 1})
+        self.client.post(f'/api/cart/add/{self.item.id}/', {'quantity': 3})
+        self.client.force_login(self.buyer)
+        self.client.post(f'/cart/add/{self.item.id}/', {'quantity': 1})
+
+        line = CartItem.objects.get(cart=self.cart)
+        self.assertEqual((line.quantity, line.held_quantity), (7, 7))
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.version, 4)
+
+    def test_shortage_leaves_the_line_unchanged(self):
+        carts.add(self.cart.id, self.item.id, 8)
+        with self.assertRaises(inventory.InsufficientStock):
+            carts.add(self.cart.id, self.item.id, 3)
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 8)
+        with self.assertRaises(ValueError):
+            carts.add(self.cart.id, self.item.id, 0)
+
+class CartBatchUpdateTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.items = [Item.objects.create(name=f"Item {i}", description="d", price=5, quantity=5, seller=self.seller)
+                      for i in range(30)]
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.client.force_authenticate(self.buyer)
+
+    def patch(self, operations):
+        return self.client.patch('/api/cart/', operations, format='json')
+
+    def test_sets_and_removes_lines_in_one_request(self):
+        first, second, third = self.items[:3]
+        self.patch([{'item_id': first.id, 'quantity': 2}, {'item_id': second.id, 'quantity': 4}])
+        response = self.patch({'items': [{'item_id': first.id, 'quantity': 0},
+                                         {'item_id': second.id, 'quantity': 1},
+                                         {'item_id': third.id, 'quantity': 3}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({line['item']['id']: line['quantity'] for line in response.data['items']},
+                         {second.id: 1, third.id: 3})
+        self.assertEqual(response.data['total_price'], '20.00')
+        held = dict(Item.objects.filter(pk__in=[first.id, second.id, third.id]).values_list('id', 'held_quantity'))
+        self.assertEqual(held, {first.id: 0, second.id: 1, third.id: 3})
+
+    def test_query_count_does_not_grow_with_operations(self):
+        def count(items, quantity):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.patch([{'item_id': item.id, 'quantity': quantity} for item in items])
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.patch([{'item_id': self.items[0].id, 'quantity': 1}])
+        few, many = count(self.items[1:3], 1), count(self.items[3:23], 1)
+        removals = count(self.items[1:3], 0), count(self.items[3:23], 0)
+        self.assertEqual(many, few)
+        self.assertEqual(removals[1], removals[0])
+
+    def test_rejects_the_whole_batch(self):
+        response = self.patch([{'item_id': self.items[0].id, 'quantity': 1}, {'item_id': 999, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['item_ids'], [999])
+
+        response = self.patch([{'item_id': self.items[0].id, 'quantity': 1}, {'item_id': self.items[1].id, 'quantity': 6}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], {self.items[1].id: 5})
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(self.patch([{'item_id': self.items[0].id, 'quantity': -1}]).status_code, 400)
+        self.assertEqual(self.patch([{'item_id': self.items[0].id, 'quantity': 1001}]).status_code, 400)
+
+    def test_removing_a_deleted_item_is_not_an_error(self):
+        gone = self.items[0].id
+        self.items[0].delete()
+        response = self.patch([{'item_id': gone, 'quantity': 0}, {'item_id': self.items[1].id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([line['item']['id'] for line in response.data['items']], [self.items[1].id])
+
+class ConcurrentAddTest(TransactionTestCase):
+    def test_no_increment_is_lost(self):
+        seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        item = Item.objects.create(name="Mug", description="d", price=5, quantity=100, seller=seller)
+        cart = Cart.objects.create(user=UserExtended.objects.create_user(email="b@example.com", username="b"))
+        barrier = threading.Barrier(20)
+
+        def add():
+            try:
+                barrier.wait()
+                carts.add(cart.id, item.id, 2)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        line = CartItem.objects.get(cart=cart)
+        self.assertEqual((line.quantity, line.held_quantity), (40, 40))
+        item.refresh_from_db()
+        self.assertEqual(item.held_quantity, 40)
+
+class CartSummaryTest(APITestCase):
+    def setUp(self):
+        seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.mug = Item.objects.create(name="Mug", description="d", price=5, quantity=10, seller=seller)
+        self.bowl = Item.objects.create(name="Bowl", description="d", price="7.50", quantity=10, seller=seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.client.force_authenticate(self.buyer)
+
+    def test_summary_in_one_query(self):
+        self.assertEqual(self.client.get('/api/cart/summary/').data,
+                         {'lines': 0, 'units': 0, 'total_price': '0.00', 'version': None})
+        cart = Cart.objects.create(user=self.buyer)
+        cart.add_item(self.mug, 2)
+        cart.add_item(self.bowl, 3)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual({key: response.data[key] for key in ('lines', 'units', 'total_price')},
+                         {'lines': 2, 'units': 5, 'total_price': '32.50'})
+
+        # The version is the full cart's ETag.
+        full = self.client.get('/api/cart/')
+        self.assertEqual(full['ETag'], response.data['version'])
+        self.assertEqual(self.client.get('/api/cart/', HTTP_IF_NONE_MATCH=response.data['version']).status_code, 304)
+        self.assertEqual(self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        cart.add_item(self.mug, 1)
+        changed = self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['units'], 6)
+        self.assertNotEqual(changed.data['version'], response.data['version'])
@@ -0,0 +1,104 @@
+import threading
+import time
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify import catalog_cache
+
+class CatalogCacheTest(APITestCase):
+    def setUp(self):
+        catalog_cache.get_cache().clear()
+        self.alice = UserExtended.objects.create_user(email="alice@example.com", username="alice")
+        self.bob = UserExtended.objects.create_user(email="bob@example.com", username="bob")
+        self.mug = Item.objects.create(name="Mug", description="Mug", price=12, quantity=3,
+                                       seller=self.alice, category="Pottery")
+        self.scarf = Item.objects.create(name="Scarf", description="Scarf", price=30, quantity=2,
+                                         seller=self.bob, category="Textiles")
+
+    def fetch(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_list_and_detail_served_from_cache(self):
+        # A detail hit still checks the item's updated_at to build its ETag.
+        for url, expected in (('/api/items/', 0), (f'/api/items/{self.mug.id}/', 1)):
+            first, _ = self.fetch(url)
+            second, queries = self.fetch(url)
+            self.assertEqual(queries, expected)
+            self.assertEqual(first, second)
+
+    def test_save_invalidates_matching_scopes_only(self):
+        alice_url = f'/api/items/?seller={self.alice.id}'
+        bob_url = f'/api/items/?seller={self.bob.id}'
+        self.fetch(alice_url)
+        self.fetch(bob_url)
+        self.fetch('/api/items/')
+
+        self.mug.price = 14
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mug.save()
+
+        data, queries = self.fetch(alice_url)
+        self.assertGreater(queries, 0)
+        self.assertEqual(data['results'][0]['price'], '14.00')
+        self.assertEqual(self.fetch(bob_url)[1], 0)
+        self.assertGreater(self.fetch('/api/items/')[1], 0)
+
+    def test_category_move_invalidates_old_category(self):
+        self.fetch('/api/items/?category=Pottery')
+        self.mug.category = "Kitchen"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mug.save()
+        data, _ = self.fetch('/api/items/?category=Pottery')
+        self.assertEqual(data['results'], [])
+
+    def test_delete_invalidates_detail(self):
+        self.fetch(f'/api/items/{self.scarf.id}/')
+        scarf_id = self.scarf.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scarf.delete()
+        self.assertEqual(self.client.get(f'/api/items/{scarf_id}/').status_code, 404)
+
+    def test_save_invalidates_on_commit_without_reading_old_row(self):
+        self.fetch('/api/items/?category=Pottery')
+        mug = Item.objects.get(pk=self.mug.pk)
+        mug.category = "Kitchen"
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as ctx:
+                mug.save()
+        self.assertFalse([query for query in ctx.captured_queries if 'SELECT' in query['sql']])
+        # Until the transaction commits, readers still get the cached page.
+        self.assertEqual(self.fetch('/api/items/?category=Pottery')[1], 0)
+        for callback in callbacks:
+            callback()
+        data, _ = self.fetch('/api/items/?category=Pottery')
+        self.assertEqual(data['results'], [])
+
+class StampedeProtectionTest(TestCase):
+    def setUp(self):
+        catalog_cache.get_cache().clear()
+
+    def test_one_builder_per_cold_key(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 1}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(catalog_cache.get_or_build('cold', build)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 8)
@@ -0,0 +1,98 @@
+import importlib.util
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, ImagePrediction
+
+HAS_TORCH = importlib.util.find_spec('torch') is not None
+
+def png_upload(name, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+@unittest.skipUnless(HAS_TORCH, "torch is not installed")
+@override_settings(CATEGORIZER_SYNC=True, IMAGE_DERIVATIVES_SYNC=True, CLASSIFIER_CATEGORIES=['Dark', 'Light'])
+class CategorizerTest(TestCase):
+    def setUp(self):
+        import torch
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+
+        # Stand-in classifier: 'Light' when the normalised image is bright.
+        self.batches = []
+
+        class Brightness(torch.nn.Module):
+            def forward(module, batch):
+                self.batches.append(len(batch))
+                means = batch.mean(dim=(1, 2, 3))
+                return torch.stack([-means, means], dim=1)
+
+        self.model = Brightness()
+        for target, value in [('craftify.categorizer.serve_predictions', self.predict),
+                              ('craftify.ml_utils.is_available', lambda: True)]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def predict(self, tensors):
+        import torch
+        return self.model(torch.stack(tensors)).argmax(dim=1).tolist()
+
+    def create_item(self, name, upload, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Item.objects.create(name=name, description="d", price=5, quantity=1,
+                                       seller=self.seller, image=upload, **fields)
+
+    def test_category_is_written_back_on_save(self):
+        item = self.create_item("Lamp", png_upload("lamp.png", "white"))
+        item.refresh_from_db()
+        self.assertEqual(item.category, "Light")
+        self.assertEqual(item.image_prediction['category'], "Light")
+        self.assertEqual(item.image_prediction['source'], item.image.name)
+
+    def test_duplicate_uploads_and_resaves_reuse_the_prediction(self):
+        first = self.create_item("Lamp", png_upload("a.png", "black"))
+        self.create_item("Other lamp", png_upload("b.png", "black"))
+        self.assertEqual(self.batches, [1])
+        self.assertEqual(ImagePrediction.objects.count(), 1)
+
+        first.refresh_from_db()
+        first.description = "Updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assertEqual(self.batches, [1])
+        self.assertEqual(first.category, "Dark")
+
+    def test_seller_category_is_kept(self):
+        item = self.create_item("Lamp", png_upload("lamp.png", "white"), category="Lighting")
+        item.refresh_from_db()
+        self.assertEqual(item.category, "Lighting")
+        self.assertEqual(item.image_prediction['category'], "Light")
+
+    def test_backfill_command_batches_uncategorized_items(self):
+        with mock.patch('craftify.categorizer.schedule'):
+            for i, color in enumerate(["white", "black", "white"]):
+                self.create_item(f"Item {i}", png_upload(f"{i}.png", color))
+            self.create_item("Chosen", png_upload("chosen.png", "white"), category="Lighting")
+
+        with mock.patch('craftify.ml_utils.load_model', return_value=self.model):
+            call_command('categorize_items', '--batch-size', '10', stdout=io.StringIO())
+
+        self.assertEqual(self.batches, [2])  # two distinct images among three items
+        categories = dict(Item.objects.values_list('name', 'category'))
+        self.assertEqual(categories, {
+            "Item 0": "Light", "Item 1": "Dark", "Item 2": "Light", "Chosen": "Lighting",
+        })
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import catalog_cache
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        catalog_cache.get_cache().clear()
+        self.user = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.item = Item.objects.create(name="Mug", description="Mug", price=12, quantity=3, seller=self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, item=self.item, quantity=1)
+        self.client.force_authenticate(self.user)
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        return first, second, len(ctx.captured_queries)
+
+    def test_unchanged_resources_return_304_after_one_lookup(self):
+        for url in (f'/api/items/{self.item.id}/', '/api/cart/', f'/api/user/{self.user.id}/'):
+            _, second, queries = self.revalidate(url)
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.content, b'')
+            # force_authenticate skips token auth, so the only query is the validator lookup.
+            self.assertEqual(queries, 1, url)
+
+    def test_item_list_revalidates_without_queries(self):
+        _, second, queries = self.revalidate('/api/items/')
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(queries, 0)
+
+    def test_changes_produce_new_etag(self):
+        first, _, _ = self.revalidate(f'/api/items/{self.item.id}/')
+        self.item.price = 20
+        self.item.save()
+        response = self.client.get(f'/api/items/{self.item.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['price'], '20.00')
+
+    def test_cart_line_change_bumps_version(self):
+        first, _, _ = self.revalidate('/api/cart/')
+        CartItem.objects.filter(cart=self.cart).first().delete()
+        response = self.client.get('/api/cart/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['items'], [])
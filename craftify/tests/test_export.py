@@ -0,0 +1,44 @@
+import csv
+import json
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+
+class ItemExportTest(APITestCase):
+    def setUp(self):
+        self.alice = UserExtended.objects.create_user(email="alice@example.com", username="alice")
+        self.bob = UserExtended.objects.create_user(email="bob@example.com", username="bob")
+        self.mug = Item.objects.create(name="Mug", description='Says "hi", twice', price=12, quantity=3,
+                                       seller=self.alice, category="Pottery")
+        Item.objects.create(name="Scarf", description="Wool", price=30, quantity=2, seller=self.bob)
+
+    def body(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.body(self.client.get('/api/items/export/')))))
+        self.assertEqual([row['name'] for row in rows], ["Mug", "Scarf"])
+        self.assertEqual(rows[0]['description'], 'Says "hi", twice')
+        self.assertEqual(rows[0]['seller_username'], "alice")
+        self.assertEqual(rows[1]['category'], "")
+
+    def test_ndjson_for_one_seller(self):
+        body = self.body(self.client.get(f'/api/items/export/?output=ndjson&seller={self.alice.id}'))
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['id'], self.mug.id)
+        self.assertEqual(records[0]['price'], "12.00")
+
+    def test_rejects_unknown_format(self):
+        self.assertEqual(self.client.get('/api/items/export/?output=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/items/export/?seller=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/items/export/?seller=²').status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_items', format='ndjson', chunk_size=1, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
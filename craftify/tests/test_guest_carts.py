@@ -0,0 +1,148 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import carts, guest_carts, inventory
+
+class GuestCartTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.mug = Item.objects.create(name="Mug", description="d", price=5, quantity=10, seller=self.seller)
+        self.bowl = Item.objects.create(name="Bowl", description="d", price=9, quantity=2, seller=self.seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer",
+                                                      password="Password123!")
+
+    def test_guest_cart_lives_in_the_cache(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/guest-cart/', {'item_id': self.mug.id, 'quantity': 2}, format='json')
+            self.client.post('/api/guest-cart/', {'item_id': self.mug.id, 'quantity': 1}, format='json')
+            response = self.client.patch('/api/guest-cart/', [{'item_id': self.bowl.id, 'quantity': 1}], format='json')
+        # The session row is created once per visitor; cart changes never reach the database.
+        self.assertFalse([query for query in ctx.captured_queries
+                          if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'django_session' not in query['sql']])
+        self.assertEqual({line['item']['id']: line['quantity'] for line in response.data['items']},
+                         {self.mug.id: 3, self.bowl.id: 1})
+        self.assertEqual(response.data['total_price'], '24.00')
+        self.assertFalse(CartItem.objects.exists())
+
+        response = self.client.patch('/api/guest-cart/', {'items': [{'item_id': self.mug.id, 'quantity': 0}]},
+                                     format='json')
+        self.assertEqual([line['item']['id'] for line in response.data['items']], [self.bowl.id])
+        self.assertEqual(self.client.post('/api/guest-cart/', {'item_id': 999, 'quantity': 1}).status_code, 404)
+
+    def test_login_merges_the_guest_cart(self):
+        Cart.objects.create(user=self.buyer).add_item(self.mug, 4)
+        self.client.post('/api/guest-cart/', {'item_id': self.mug.id, 'quantity': 2}, format='json')
+        self.client.post('/api/guest-cart/', {'item_id': self.bowl.id, 'quantity': 2}, format='json')
+        # Someone else takes one bowl before the visitor signs in.
+        Cart.objects.create(user=self.seller).add_item(self.bowl, 1)
+
+        self.client.force_login(self.buyer)
+        lines = dict(CartItem.objects.filter(cart__user=self.buyer).values_list('item_id', 'quantity'))
+        self.assertEqual(lines, {self.mug.id: 6, self.bowl.id: 1})
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.held_quantity, 6)
+        self.assertEqual(self.client.get('/api/guest-cart/').data['items'], [])
+
+    def test_failed_merge_keeps_the_guest_cart_and_the_login(self):
+        self.client.post('/api/guest-cart/', {'item_id': self.mug.id, 'quantity': 2}, format='json')
+        shortage = inventory.InsufficientStock({self.mug.id: (2, 0)})
+        with mock.patch('craftify.carts.add_available', side_effect=shortage), \
+                self.assertLogs('craftify.guest_carts', 'ERROR'):
+            response = self.client.post('/api/token/', {'email': 'buyer@example.com', 'password': 'Password123!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(self.client.get('/api/guest-cart/').data['items'][0]['quantity'], 2)
+
+    def test_concurrent_adds_are_not_lost(self):
+        request = SimpleNamespace(session={})
+        guest_carts.get_token(request, create=True)
+        barrier = threading.Barrier(10)
+        cache = carts.get_cache()
+
+        class SlowReads:
+            """The cart cache, with reads slow enough for adds to overlap."""
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def get(self, *args, **kwargs):
+                value = cache.get(*args, **kwargs)
+                time.sleep(0.01)
+                return value
+
+        def add():
+            barrier.wait()
+            guest_carts.add(request, self.mug.id, 1)
+
+        with mock.patch('craftify.carts.get_cache', return_value=SlowReads()):
+            threads = [threading.Thread(target=add) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(guest_carts.lines(request), {self.mug.id: 10})
+
+    def test_token_login_merges_the_guest_cart(self):
+        self.client.post('/api/guest-cart/', {'item_id': self.mug.id, 'quantity': 2}, format='json')
+        response = self.client.post('/api/token/', {'email': 'buyer@example.com', 'password': 'Password123!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(CartItem.objects.get(cart__user=self.buyer).quantity, 2)
+
+@override_settings(CART_WRITE_BEHIND=60)
+class WriteBehindTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.item = Item.objects.create(name="Mug", description="d", price=5, quantity=20, seller=self.seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.cart = Cart.objects.create(user=self.buyer)
+        self.client.force_authenticate(self.buyer)
+        self.addCleanup(carts.flush, self.cart.pk)
+
+    def test_taps_are_coalesced_into_one_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(10):
+                response = self.client.post(f'/api/cart/add/{self.item.id}/', {'quantity': 1})
+                self.assertEqual(response.status_code, 202)
+        self.assertFalse([query for query in ctx.captured_queries
+                          if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+        self.assertFalse(CartItem.objects.exists())
+
+        # Reading the cart writes the pending adds first.
+        response = self.client.get('/api/cart/')
+        self.assertEqual(response.data[0]['items'][0]['quantity'], 10)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.held_quantity, 10)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.version, 1)
+
+    def test_adds_beyond_stock_are_refused_up_front(self):
+        self.assertEqual(self.client.post(f'/api/items/{self.item.id}/add_to_cart/', {'quantity': 15}).status_code, 202)
+        response = self.client.post(f'/api/cart/add/{self.item.id}/', {'quantity': 6})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], 20)
+        self.assertEqual(carts.flush(self.cart.pk), {self.item.pk: 15})
+
+    def test_flush_trims_to_available_stock(self):
+        for _ in range(2):
+            carts.add_later(self.cart.pk, self.item.pk, 9)
+        Cart.objects.create(user=self.seller).add_item(self.item, 5)
+        with self.assertLogs('craftify.carts', 'WARNING'):
+            self.assertEqual(carts.flush(self.cart.pk), {self.item.pk: 15})
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 15)
+
+    def test_any_worker_flushes_pending_adds(self):
+        carts.add_later(self.cart.pk, self.item.pk, 3)
+        # The worker that took the add dies before its timer fires.
+        carts._timers.pop(self.cart.pk).cancel()
+        response = self.client.post('/api/checkout/')
+        self.assertEqual(response.status_code, 201)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.item.held_quantity), (17, 0))
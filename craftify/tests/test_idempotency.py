@@ -0,0 +1,48 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, PurchaseOrder
+from craftify.models.cart_controller import Cart
+from craftify.models.idempotency_controller import IdempotencyKey
+
+class IdempotentCheckoutTest(APITestCase):
+    def setUp(self):
+        seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.item = Item.objects.create(name="Mug", description="d", price=5, quantity=10, seller=seller)
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        Cart.objects.create(user=self.buyer).add_item(self.item, 2)
+        self.client.force_authenticate(self.buyer)
+
+    def checkout(self, key, city='London'):
+        return self.client.post('/api/checkout/', {'shipping': {'city': city}}, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout('retry-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            again = self.checkout('retry-1')
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(PurchaseOrder.objects.count(), 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 8)
+
+        self.assertEqual(self.checkout('retry-1', city='Paris').status_code, 422)
+        # A new key is a new checkout; the cart is empty now.
+        self.assertEqual(self.checkout('retry-2').status_code, 400)
+
+    def test_prune_deletes_expired_keys_in_batches(self):
+        self.checkout('old-1')
+        self.checkout('old-2')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.checkout('fresh')
+
+        output = StringIO()
+        call_command('prune_idempotency_keys', '--batch-size', '1', stdout=output)
+        self.assertIn("Pruned 2 idempotency keys.", output.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['fresh'])
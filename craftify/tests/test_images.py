@@ -0,0 +1,63 @@
+import io
+import shutil
+import tempfile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify import images
+
+def png_upload(name="photo.png", size=(1200, 900), color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+class ImageDerivativeTest(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVES_SYNC=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+
+    def create_item(self, name, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Item.objects.create(name=name, description="d", price=5, quantity=1,
+                                       seller=self.seller, image=upload)
+
+    def test_falls_back_to_original_until_ready(self):
+        item = Item(name="Mug", description="d", price=5, quantity=1, seller=self.seller)
+        item.image.save("mug.png", png_upload(), save=False)
+        urls = images.image_urls(item.image, item.image_derivatives)
+        self.assertEqual(urls['thumb']['webp'], urls['original'])
+
+    def test_generates_hashed_derivatives(self):
+        item = self.create_item("Mug", png_upload())
+        item.refresh_from_db()
+        digest = item.image_derivatives['digest']
+        for size, edge in images.SIZES.items():
+            for ext in images.FORMATS:
+                name = images.derivative_name(digest, size, ext)
+                self.assertTrue(default_storage.exists(name))
+                with default_storage.open(name) as handle, Image.open(handle) as derived:
+                    self.assertEqual(max(derived.size), edge)
+
+        data = self.client.get(f'/api/items/{item.id}/').data
+        self.assertTrue(data['image_urls']['thumb']['webp'].endswith(f'{digest}-thumb.webp'))
+        self.assertTrue(data['image_urls']['medium']['jpeg'].endswith(f'{digest}-medium.jpeg'))
+
+    def test_identical_uploads_share_derivatives(self):
+        first = self.create_item("Mug", png_upload("a.png"))
+        second = self.create_item("Cup", png_upload("b.png"))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_derivatives['digest'], second.image_derivatives['digest'])
+
+    def test_render_in_process_pool(self):
+        data = png_upload().read()
+        rendered = images.get_executor().submit(images.render, data).result(timeout=60)
+        self.assertEqual(set(rendered), {(s, e) for s in images.SIZES for e in images.FORMATS})
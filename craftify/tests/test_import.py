@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+
+class ItemImportTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        Item.objects.create(name="Mug", description="Old", price=10, quantity=1,
+                            seller=self.seller, category="Pottery")
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, name, content):
+        return self.client.post('/api/items/import/', {'file': SimpleUploadedFile(name, content.encode())},
+                                format='multipart')
+
+    def test_csv_upsert_with_row_errors(self):
+        response = self.upload('items.csv', (
+            "name,description,price,quantity,category\n"
+            "Mug,New glaze,12.50,4,Pottery\n"
+            "Bowl,Wide,20,2,Pottery\n"
+            "Broken,,-1,x,\n"
+            "Empty,None left,5,0,\n"
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 4)
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'description', 'price', 'quantity'})
+        # Item.quantity must be at least 1, as in the API and admin.
+        self.assertEqual((response.data['errors'][1]['row'], list(response.data['errors'][1]['errors'])), (5, ['quantity']))
+        mug = Item.objects.get(seller=self.seller, name="Mug")
+        self.assertEqual((mug.description, str(mug.price), mug.quantity), ("New glaze", "12.50", 4))
+        self.assertEqual(Item.objects.filter(seller=self.seller).count(), 2)
+        # Imported rows are searchable straight away.
+        self.assertEqual(len(self.client.get('/api/items/search/?q=wide').data['results']), 1)
+
+    def test_ndjson_in_chunks(self):
+        lines = [json.dumps({'name': f'Item {i}', 'description': 'd', 'price': '1.00', 'quantity': 1})
+                 for i in range(25)]
+        lines.insert(3, '{not json')
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            handle.write('\n'.join(lines))
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_items', handle.name, seller=self.seller.email, chunk_size=10, stdout=out, stderr=err)
+        self.assertIn('Created 25, updated 0, rejected 1 rows.', out.getvalue())
+        self.assertIn('Row 4', err.getvalue())
+        self.assertEqual(Item.objects.filter(seller=self.seller).count(), 26)
@@ -0,0 +1,76 @@
+import threading
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, PurchaseOrder
+from craftify.models.cart_controller import Cart, CartItem
+from craftify import inventory
+
+class ReserveTest(TestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.mug = Item.objects.create(name="Mug", description="d", price=5, quantity=3, seller=self.seller)
+        self.bowl = Item.objects.create(name="Bowl", description="d", price=9, quantity=1, seller=self.seller)
+
+    def test_decrements_every_item_in_one_statement(self):
+        with self.assertNumQueries(3):  # savepoint, one update, release; the cache lookup runs on commit
+            inventory.reserve([(self.mug.id, 2), (self.bowl.id, 1)])
+        self.mug.refresh_from_db()
+        self.bowl.refresh_from_db()
+        self.assertEqual((self.mug.quantity, self.bowl.quantity), (1, 0))
+
+    def test_shortage_rolls_back_every_line(self):
+        with self.assertRaises(inventory.InsufficientStock) as raised:
+            inventory.reserve([(self.mug.id, 1), (self.bowl.id, 1), (self.bowl.id, 1)])
+        self.assertEqual(raised.exception.shortages, {self.bowl.id: (2, 1)})
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.quantity, 3)
+
+    def test_checkout_view_reports_shortage(self):
+        buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer", password="pw")
+        cart = Cart.objects.create(user=buyer)
+        CartItem.objects.create(cart=cart, item=self.bowl, quantity=2)
+        self.client.force_login(buyer)
+        response = self.client.post('/checkout/')
+        self.assertRedirects(response, '/cart/', fetch_redirect_response=False)
+        self.assertEqual([str(message) for message in get_messages(response.wsgi_request)],
+                         ["Only 1 of Bowl left; you asked for 2."])
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(cart.items.count(), 1)
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    def test_hot_item_is_never_oversold(self):
+        seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        item = Item.objects.create(name="Limited print", description="d", price=20, quantity=10, seller=seller)
+        carts = []
+        for i in range(30):
+            buyer = UserExtended.objects.create_user(email=f"buyer{i}@example.com", username=f"buyer{i}")
+            cart = Cart.objects.create(user=buyer)
+            CartItem.objects.create(cart=cart, item=item, quantity=1)
+            carts.append(cart)
+
+        barrier = threading.Barrier(len(carts))
+        outcomes = []
+
+        def checkout(cart):
+            try:
+                barrier.wait()
+                outcomes.append(len(cart.process_to_purchase_order()) == 1)
+            except inventory.InsufficientStock:
+                outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        item.refresh_from_db()
+        self.assertEqual(len(outcomes), 30)
+        self.assertEqual(outcomes.count(True), 10)
+        self.assertEqual(item.quantity, 0)
+        self.assertEqual(PurchaseOrder.objects.count(), 10)
+        self.assertEqual(CartItem.objects.count(), 20)
@@ -0,0 +1,79 @@
+from itertools import combinations
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+
+FILTERS = {
+    'seller': '1',
+    'category': 'Pottery',
+    'min_price': '5',
+    'max_price': '50',
+    'in_stock': 'true',
+    'created_after': '2024-01-01',
+}
+
+class ItemFilterTest(APITestCase):
+    def setUp(self):
+        self.alice = UserExtended.objects.create_user(
+            email="alice@example.com", password="Password123!", username="alice"
+        )
+        self.bob = UserExtended.objects.create_user(
+            email="bob@example.com", password="Password123!", username="bob"
+        )
+        Item.objects.create(name="Mug", description="Mug", price=12, quantity=3,
+                            seller=self.alice, category="Pottery")
+        Item.objects.create(name="Vase", description="Vase", price=80, quantity=1,
+                            seller=self.alice, category="Pottery")
+        Item.objects.create(name="Scarf", description="Scarf", price=30, quantity=0,
+                            seller=self.bob, category="Textiles")
+
+    def names(self, query):
+        response = self.client.get('/api/items/' + query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['name'] for row in response.data['results'])
+
+    def test_filters(self):
+        self.assertEqual(self.names(f'?seller={self.alice.id}'), ['Mug', 'Vase'])
+        self.assertEqual(self.names('?category=Pottery&max_price=50'), ['Mug'])
+        self.assertEqual(self.names('?min_price=20'), ['Scarf', 'Vase'])
+        self.assertEqual(self.names('?in_stock=true'), ['Mug', 'Vase'])
+        self.assertEqual(self.names('?created_after=2999-01-01'), [])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertEqual(self.client.get('/api/items/?seller=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/items/?min_price=cheap').status_code, 400)
+        self.assertEqual(self.client.get('/api/items/?created_after=yesterday').status_code, 400)
+
+    def test_every_filter_combination_uses_an_index(self):
+        """
+        EXPLAIN QUERY PLAN searches an index for every filter combination,
+        except the ones ItemFilter documents as walking an ordered index.
+        """
+        table = Item._meta.db_table
+        by_created = next(index.name for index in Item._meta.indexes
+                          if index.fields == ['created_at', 'id'] and index.condition is None)
+        walks = {
+            (): by_created,
+            ('min_price',): by_created,
+            ('max_price',): by_created,
+            ('in_stock',): 'item_in_stock_created',
+            ('min_price', 'in_stock'): 'item_in_stock_created',
+            ('max_price', 'in_stock'): 'item_in_stock_created',
+        }
+        for size in range(len(FILTERS) + 1):
+            for names in combinations(FILTERS, size):
+                query = '&'.join(f'{name}={FILTERS[name]}' for name in names)
+                with CaptureQueriesContext(connection) as ctx:
+                    self.client.get(f'/api/items/?{query}')
+                sql = next(q['sql'] for q in ctx.captured_queries if f'FROM "{table}"' in q['sql'])
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plan = [row[-1] for row in cursor.fetchall()]
+                for step in plan:
+                    if table not in step or step.startswith(f'SEARCH {table} '):
+                        continue
+                    self.assertIn(names, walks, f'{query or "(no filters)"}: {plan}')
+                    self.assertEqual(step, f'SCAN {table} USING INDEX {walks[names]}',
+                                     f'{query or "(no filters)"}: {plan}')
@@ -0,0 +1,127 @@
+import importlib.util
+import threading
+import unittest
+from django.test import SimpleTestCase
+
+HAS_TORCH = importlib.util.find_spec('torch') is not None
+
+@unittest.skipUnless(HAS_TORCH, "torch is not installed")
+class InferenceServerTest(SimpleTestCase):
+    def make_server(self, **kwargs):
+        import torch
+        from craftify.ml_utils import InferenceServer
+
+        batch_sizes = []
+
+        class Recorder(torch.nn.Module):
+            def forward(self, batch):
+                batch_sizes.append(len(batch))
+                # Class 1 when the image's mean is above 0.5.
+                means = batch.mean(dim=(1, 2, 3))
+                return torch.stack([1 - means, means], dim=1)
+
+        loads = []
+        def loader():
+            loads.append(1)
+            return Recorder()
+
+        return InferenceServer(loader, **kwargs), batch_sizes, loads
+
+    def test_model_loads_lazily_once(self):
+        import torch
+        server, _, loads = self.make_server()
+        self.assertEqual(loads, [])
+        self.assertEqual(server.submit(torch.ones(1, 3, 4, 4)).result(timeout=5), 1)
+        self.assertEqual(server.submit(torch.zeros(3, 4, 4)).result(timeout=5), 0)
+        self.assertEqual(loads, [1])
+
+    def test_concurrent_requests_are_batched(self):
+        import torch
+        server, batch_sizes, _ = self.make_server(max_batch_size=8, max_wait=0.5)
+        barrier = threading.Barrier(8)
+        results = {}
+
+        def client(i):
+            barrier.wait()
+            results[i] = server.submit(torch.full((3, 4, 4), float(i % 2))).result(timeout=5)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {i: i % 2 for i in range(8)})
+        self.assertEqual(sum(batch_sizes), 8)
+        self.assertLess(len(batch_sizes), 8)
+        self.assertLessEqual(max(batch_sizes), 8)
+
+    def test_odd_input_does_not_fail_its_batch(self):
+        import torch
+        server, _, _ = self.make_server(max_batch_size=4, max_wait=0.5)
+        with self.assertRaises(ValueError):
+            server.submit(torch.ones(1, 4, 4))
+        # Mixed image sizes cannot be stacked; each request still gets its own answer.
+        futures = [server.submit(torch.ones(3, 4, 4)), server.submit(torch.zeros(3, 5, 5)),
+                   server.submit(torch.ones(3, 4, 4))]
+        self.assertEqual([future.result(timeout=5) for future in futures], [1, 0, 1])
+
+    def test_load_failure_is_reported_to_callers(self):
+        import torch
+        from craftify.ml_utils import InferenceServer
+
+        def broken():
+            raise FileNotFoundError("model.pth")
+
+        server = InferenceServer(broken)
+        with self.assertRaises(FileNotFoundError):
+            server.submit(torch.zeros(3, 4, 4)).result(timeout=5)
+
+
+@unittest.skipUnless(HAS_TORCH, "torch is not installed")
+class ExportClassifierTest(SimpleTestCase):
+    def test_exported_variant_is_loaded_by_setting(self):
+        import os
+        import tempfile
+        import torch
+        from io import StringIO
+        from django.core.management import call_command
+        from django.test import override_settings
+        from craftify import ml_utils
+
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command('export_classifier', '--untrained', '--variant', 'torchscript', '--samples', '2',
+                         '--min-agreement', '1.0', '--output-dir', directory, stdout=out)
+            self.assertIn('top-1 agreement 100.0%', out.getvalue())
+            self.assertTrue(os.path.exists(os.path.join(directory, ml_utils.VARIANTS['torchscript'])))
+
+            with override_settings(CLASSIFIER_VARIANT='torchscript', CLASSIFIER_ARTIFACT_DIR=directory):
+                model = ml_utils.load_model()
+            self.assertIsInstance(model, torch.jit.ScriptModule)
+            with torch.inference_mode():
+                self.assertEqual(model(torch.rand(3, 3, 224, 224)).shape, (3, ml_utils.NUM_CLASSES))
+
+    def test_unknown_variant_is_rejected(self):
+        from django.test import override_settings
+        from craftify import ml_utils
+
+        with override_settings(CLASSIFIER_VARIANT='onnx'):
+            with self.assertRaises(ValueError):
+                ml_utils.load_model()
+
+
+class LazyImportTest(SimpleTestCase):
+    def test_startup_does_not_import_heavy_modules(self):
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        script = (
+            "import sys, django; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "import craftify.ml_utils, craftify.categorizer; "
+            "print(','.join(m for m in ('torch', 'torchvision', 'numpy') if m in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), '')
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, PurchaseOrder, PurchaseOrderItem
+from craftify.models.cart_controller import Cart
+
+class CheckoutApiTest(APITestCase):
+    def setUp(self):
+        self.sellers = [UserExtended.objects.create_user(email=f"seller{i}@example.com", username=f"seller{i}")
+                        for i in range(2)]
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.cart = Cart.objects.create(user=self.buyer)
+        self.client.force_authenticate(self.buyer)
+
+    def fill(self, lines):
+        for i in range(lines):
+            item = Item.objects.create(name=f"Item {Item.objects.count()}", description="d", price="2.50",
+                                       quantity=5, seller=self.sellers[i % 2])
+            self.cart.add_item(item, 2)
+
+    def checkout(self):
+        return self.client.post('/api/checkout/', {
+            'shipping': {'name': 'Ada', 'city': 'London'},
+            'payment': {'cardNumber': '4242424242424242', 'cardExpiry': '12/30', 'cardCVC': '123'},
+        }, format='json')
+
+    def test_one_order_per_seller(self):
+        self.fill(3)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted((order['seller'], order['total_amount'], len(order['items']))
+                                for order in response.data['orders']),
+                         sorted([(self.sellers[0].id, '10.00', 2), (self.sellers[1].id, '5.00', 1)]))
+        self.assertEqual(response.data['total_amount'], '15.00')
+        self.assertEqual(response.data['items'][0]['price'], '2.50')
+        self.assertEqual(response.data['payment'], {'last4': '4242'})
+        self.assertEqual(response.data['shipping']['city'], 'London')
+
+        self.assertEqual(PurchaseOrder.objects.filter(buyer=self.buyer).count(), 2)
+        self.assertEqual(PurchaseOrderItem.objects.count(), 3)
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(set(Item.objects.values_list('quantity', 'held_quantity')), {(3, 0)})
+        self.assertEqual(self.checkout().status_code, 400)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        counts = []
+        for lines in (2, 20):
+            self.fill(lines)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.checkout().status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_shortage_places_nothing(self):
+        self.fill(2)
+        line = self.cart.items.first()
+        Item.objects.filter(pk=line.item_id).update(quantity=1)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'],
+                         [{'item_id': line.item_id, 'name': line.item.name, 'requested': 2, 'available': 1}])
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(self.cart.items.count(), 2)
+
+class OrderHistoryTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+        self.buyer = UserExtended.objects.create_user(email="buyer@example.com", username="buyer")
+        self.items = [Item.objects.create(name=f"Item {i}", description="d", price=3, quantity=5, seller=self.seller)
+                      for i in range(3)]
+        self.client.force_authenticate(self.buyer)
+
+    def place(self, count, buyer=None):
+        for _ in range(count):
+            order = PurchaseOrder.objects.create(seller=self.seller, buyer=buyer or self.buyer, total_amount=9)
+            PurchaseOrderItem.objects.bulk_create([
+                PurchaseOrderItem(purchase_order=order, item=item, quantity=1, price=3) for item in self.items
+            ])
+
+    def test_fifty_orders_in_constant_queries(self):
+        self.place(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/orders/?page_size=50')
+        self.place(45)
+        self.place(3, buyer=self.seller)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/orders/?page_size=50')
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertEqual(len(large.captured_queries), 2)  # orders, their items with item and seller
+
+        orders = response.data['results']
+        self.assertEqual(len(orders), 50)
+        self.assertEqual(orders[0]['total_amount'], '9.00')
+        self.assertEqual([(line['name'], line['total_price']) for line in orders[0]['items']][0], ('Item 0', '3.00'))
+        self.assertGreater(orders[0]['id'], orders[-1]['id'])
+
+    def test_days_window_and_cursor(self):
+        self.place(3)
+        PurchaseOrder.objects.filter(pk=PurchaseOrder.objects.order_by('pk').first().pk).update(
+            created_at=timezone.now() - timedelta(days=40)
+        )
+        self.assertEqual(len(self.client.get('/api/orders/?days=30').data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/orders/').data['results']), 3)
+        self.assertEqual(self.client.get('/api/orders/?days=soon').status_code, 400)
+
+        first = self.client.get('/api/orders/?page_size=2')
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+
+    def test_orders_are_only_placed_by_checkout(self):
+        response = self.client.post('/api/orders/', {'seller': self.seller.id}, format='json')
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(PurchaseOrder.objects.exists())
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+
+class ItemKeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(
+            email="seller@example.com", password="Password123!", username="seller"
+        )
+        now = timezone.now()
+        for i in range(25):
+            Item.objects.create(
+                name=f"Item {i}", description="Handmade", price=10, quantity=1, seller=self.seller
+            )
+        # Give pairs of items the same timestamp so the id tie-breaker is exercised.
+        for item in Item.objects.all():
+            Item.objects.filter(pk=item.pk).update(created_at=now - timedelta(minutes=item.pk // 2))
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_item_once_in_ordering(self):
+        """Following next links visits every item exactly once, newest first."""
+        expected = list(Item.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.collect_pages('/api/items/?page_size=7'), expected)
+
+    def test_previous_link_returns_prior_page(self):
+        """The previous cursor of page two yields page one again."""
+        first = self.client.get('/api/items/?page_size=10')
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(first.data['previous'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+
+    def test_no_count_query(self):
+        """Paging never issues a COUNT(*)."""
+        first = self.client.get('/api/items/?page_size=5')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_invalid_cursor(self):
+        """A tampered cursor is rejected with 404."""
+        response = self.client.get('/api/items/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
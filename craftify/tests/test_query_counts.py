@@ -0,0 +1,63 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item, PurchaseOrder, PurchaseOrderItem
+from craftify.models.cart_controller import Cart, CartItem
+
+class QueryCountTest(APITestCase):
+    def setUp(self):
+        self.buyer = UserExtended.objects.create_user(
+            email="buyer@example.com", password="Password123!", username="buyer"
+        )
+        self.cart = Cart.objects.create(user=self.buyer)
+        self.order = PurchaseOrder.objects.create(seller=self.buyer, buyer=self.buyer)
+        self.client.force_authenticate(self.buyer)
+        self.count = 0
+
+    def add_items(self, n):
+        for _ in range(n):
+            self.count += 1
+            seller = UserExtended.objects.create_user(
+                email=f"seller{self.count}@example.com", username=f"seller{self.count}"
+            )
+            item = Item.objects.create(name=f"Item {self.count}", description="Handmade",
+                                       price=5, quantity=10, seller=seller)
+            CartItem.objects.create(cart=self.cart, item=item, quantity=2)
+            PurchaseOrderItem.objects.create(purchase_order=self.order, item=item, quantity=1, price=5)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.add_items(2)
+        small = self.count_queries(url)
+        self.add_items(8)
+        self.assertEqual(self.count_queries(url), small)
+
+    def test_item_list(self):
+        self.assertConstantQueries('/api/items/')
+
+    def test_cart(self):
+        self.assertConstantQueries('/api/cart/')
+
+    def test_sparse_fieldset(self):
+        self.add_items(1)
+        response = self.client.get('/api/items/?fields=id,name,price,image')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price', 'image'})
+
+    def test_cart_with_1_10_and_100_lines(self):
+        counts = []
+        for lines in (1, 10, 100):
+            self.add_items(lines - self.count)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/cart/')
+            counts.append(len(ctx.captured_queries))
+            self.assertEqual(len(response.data[0]['items']), lines)
+            self.assertEqual(response.data[0]['items'][0]['total_price'], '10.00')
+            self.assertEqual(response.data[0]['total_price'], f'{10 * lines}.00')
+        # Validators, cart with its aggregated total, prefetched lines.
+        self.assertEqual(counts, [3, 3, 3])
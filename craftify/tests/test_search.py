@@ -0,0 +1,56 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify import search
+
+class ItemSearchTest(APITestCase):
+    def setUp(self):
+        self.seller = UserExtended.objects.create_user(
+            email="seller@example.com", password="Password123!", username="seller"
+        )
+        self.mug = Item.objects.create(name="Ceramic Mug", description="Hand thrown stoneware",
+                                       price=15, quantity=2, seller=self.seller)
+        self.bowl = Item.objects.create(name="Salad Bowl", description="Turned from ceramic-like <resin>",
+                                        price=40, quantity=1, seller=self.seller)
+        Item.objects.create(name="Wool Scarf", description="Knitted", price=25, quantity=4,
+                            seller=self.seller)
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranks_name_matches_first_and_highlights(self):
+        response = self.client.get('/api/items/search/?q=ceramic')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response), [self.mug.id, self.bowl.id])
+        self.assertEqual(response.data['results'][0]['highlight']['name'], '<mark>Ceramic</mark> Mug')
+        self.assertIn('&lt;resin&gt;', response.data['results'][1]['highlight']['description'])
+
+    def test_prefix_and_operator_characters(self):
+        self.assertEqual(self.ids(self.client.get('/api/items/search/?q=salad bo')), [self.bowl.id])
+        self.assertEqual(self.client.get('/api/items/search/?q="OR NEAR(').status_code, 200)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.mug.name = "Porcelain Cup"
+        self.mug.save()
+        self.assertEqual(self.ids(self.client.get('/api/items/search/?q=porcelain')), [self.mug.id])
+        self.bowl.delete()
+        self.assertEqual(self.ids(self.client.get('/api/items/search/?q=ceramic')), [])
+
+    def test_pagination(self):
+        first = self.client.get('/api/items/search/?q=ceramic&page_size=1')
+        self.assertEqual(self.ids(first), [self.mug.id])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(second), [self.bowl.id])
+        self.assertIsNone(second.data['next'])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.ids(self.client.get('/api/items/search/?q=scarf')), [Item.objects.get(name="Wool Scarf").id])
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get('/api/items/search/').status_code, 400)
@@ -0,0 +1,117 @@
+import importlib.util
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from craftify.models.user_ext_controller import UserExtended
+from craftify.models.item_controller import Item
+from craftify import similarity
+
+HAS_TORCH = importlib.util.find_spec('torch') is not None
+
+def png_upload(name, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+def features(*values):
+    """A FEATURES-wide activation vector whose leading entries are ``values``."""
+    vector = np.zeros(512, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+@unittest.skipUnless(HAS_TORCH, "torch is not installed")
+class SimilarityIndexTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        overrides = override_settings(SIMILARITY_INDEX_DIR=self.directory, SIMILARITY_SYNC=True,
+                                      IMAGE_DERIVATIVES_SYNC=True, MEDIA_ROOT=self.directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.seller = UserExtended.objects.create_user(email="seller@example.com", username="seller")
+
+    def publish(self, rows):
+        ids = [item_id for item_id, _ in rows]
+        vectors = similarity.Projection().apply(np.reshape([vector for _, vector in rows], (-1, 512)))
+        similarity.write_generation(self.directory, ids, vectors, similarity.Projection())
+
+    def test_neighbours_are_ranked_by_cosine(self):
+        self.publish([(1, features(1, 0)), (2, features(1, 0.1)), (3, features(0, 1)), (4, features(1, 0.5))])
+        matches = similarity.similar(1, limit=2)
+        self.assertEqual([item_id for item_id, _ in matches], [2, 4])
+        self.assertGreater(matches[0][1], 0.99)
+        self.assertIsNone(similarity.similar(99))
+
+    def test_incremental_updates_grow_and_reuse_rows(self):
+        self.publish([(1, features(1, 0))])
+        for item_id in range(2, similarity.MIN_CAPACITY + 10):
+            similarity.upsert(item_id, features(0, 1))
+        similarity.upsert(5000, features(1, 0.01))
+        self.assertEqual(similarity.read_meta(self.directory)['capacity'], similarity.MIN_CAPACITY * 2)
+        self.assertEqual(similarity.similar(1, limit=1)[0][0], 5000)
+
+        count = similarity.read_meta(self.directory)['count']
+        similarity.remove(5000)
+        self.assertNotEqual(similarity.similar(1, limit=1)[0][0], 5000)
+        similarity.upsert(6000, features(1, 0.02))
+        self.assertEqual(similarity.read_meta(self.directory)['count'], count)
+        self.assertEqual(similarity.similar(1, limit=1)[0][0], 6000)
+
+    def test_projection_reduces_dimensions(self):
+        rng = np.random.default_rng(0)
+        sample = rng.standard_normal((200, 512)).astype(np.float32)
+        projection = similarity.Projection.fit(sample, 16)
+        vectors = projection.apply(sample)
+        self.assertEqual(vectors.shape, (200, 16))
+        self.assertEqual(vectors.dtype, np.float16)
+        np.testing.assert_allclose(np.linalg.norm(vectors.astype(np.float32), axis=1), 1, atol=1e-2)
+
+    def test_similar_endpoint_and_signal_updates(self):
+        colors = {'red': features(1, 0), 'orange': features(1, 0.2), 'blue': features(0, 1)}
+
+        def embed(tensors):
+            # Stand-in backbone keyed on the normalised red and green channels.
+            return np.stack([colors['blue'] if tensor[0].mean() < 0 else
+                             colors['red'] if tensor[1].mean() < -1 else colors['orange']
+                             for tensor in tensors])
+
+        self.publish([])
+        with mock.patch('craftify.similarity.embed', embed), \
+                mock.patch('craftify.ml_utils.is_available', return_value=True), \
+                mock.patch('craftify.categorizer.schedule'):
+            items = {}
+            for color in colors:
+                with self.captureOnCommitCallbacks(execute=True):
+                    items[color] = Item.objects.create(name=color, description="d", price=5, quantity=1,
+                                                       seller=self.seller, image=png_upload(f"{color}.png", color))
+
+            response = self.client.get(f"/api/items/{items['red'].id}/similar/?limit=1")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['name'] for row in response.data['results']], ['orange'])
+            self.assertGreater(response.data['results'][0]['similarity'], 0.9)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                items['orange'].delete()
+        response = self.client.get(f"/api/items/{items['red'].id}/similar/?limit=1")
+        self.assertEqual([row['name'] for row in response.data['results']], ['blue'])
+        self.assertEqual(self.client.get("/api/items/999/similar/").status_code, 404)
+
+    def test_rebuild_command_embeds_existing_images(self):
+        from django.core.management import call_command
+
+        vectors = iter([features(1, 0), features(0, 1), features(1, 0.1)])
+        with mock.patch('craftify.similarity.schedule'), mock.patch('craftify.categorizer.schedule'):
+            items = [Item.objects.create(name=f"Item {i}", description="d", price=5, quantity=1,
+                                         seller=self.seller, image=png_upload(f"{i}.png", "red"))
+                     for i in range(3)]
+        with mock.patch('craftify.similarity.embed', lambda tensors: np.stack([next(vectors) for _ in tensors])):
+            call_command('build_similarity_index', '--batch-size', '2', '--dim', '0', stdout=io.StringIO())
+        self.assertEqual(similarity.read_meta(self.directory)['count'], 3)
+        self.assertEqual(similarity.similar(items[0].id, limit=1)[0][0], items[2].id)
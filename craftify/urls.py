@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 from craftify.views import item_views, user_views, cart_views
 from craftify.views.api_views import (
     ItemViewSet,
@@ -10,6 +10,9 @@ from craftify.views.api_views import (
     PurchaseOrderViewSet,
     PurchaseOrderItemViewSet,
     CartViewSet,
+    CheckoutView,
+    GuestCartView,
+    TokenObtainPairView,
     UserListView
 )
 
@@ -21,9 +24,13 @@ router.register(r'orders', PurchaseOrderViewSet)
 router.register(r'order-items', PurchaseOrderItemViewSet)
 
 api_urlpatterns = [
+    # The router maps no PATCH on a list route; batch cart updates go to the cart itself.
+    path('cart/', CartViewSet.as_view({'get': 'list', 'post': 'create', 'patch': 'update_lines'}), name='cart-lines'),
     path('', include(router.urls)),
     path('cart/add/<int:item_id>/', CartViewSet.as_view({'post': 'add_to_cart'}), name='cart-add-item'),
     path('cart/remove_from_cart/<int:item_id>/', CartViewSet.as_view({'delete': 'remove_from_cart'}), name='cart-remove-item'),
+    path('guest-cart/', GuestCartView.as_view(), name='guest-cart'),
+    path('checkout/', CheckoutView.as_view(), name='api-checkout'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('signup/', SignupView.as_view(), name='api_signup'),
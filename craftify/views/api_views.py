@@ -1,27 +1,41 @@
+from decimal import Decimal
 from rest_framework import viewsets, generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch, Max, Count, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from craftify.models.item_controller import (
     Item,
     PurchaseOrder,
     PurchaseOrderItem
 )
-from craftify.models.cart_controller import Cart, CartItem
+from craftify.models.cart_controller import Cart, CartItem, line_total
 from craftify.serializers.serializers import (
     ItemSerializer,
     UserProfileSerializer,
     CartSerializer,
     CartItemSerializer,
+    CartLineSerializer,
     PurchaseOrderSerializer,
     PurchaseOrderItemSerializer
 )
 from craftify.permissions import IsSellerOrReadOnly, IsOwnerOrReadOnly
+from craftify.pagination import KeysetPagination
+from craftify.filters import ItemFilter, OrderFilter, ParamParsers
+from craftify import search, autocomplete, catalog_cache, importer, exporter, inventory, carts, guest_carts, orders
+from craftify.conditional import make_etag, not_modified, set_validators
+from craftify.idempotency import idempotent
 
 User = get_user_model()
 
@@ -32,29 +46,167 @@ class BaseModelViewSet(viewsets.ModelViewSet):
         return self.queryset.filter(user=self.request.user)
 
 class ItemViewSet(viewsets.ModelViewSet):
-    queryset = Item.objects.all()
+    queryset = Item.objects.select_related('seller')
     serializer_class = ItemSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsSellerOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [ItemFilter]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.request.query_params.get('fields')
+        if fields and self.request.method == 'GET':
+            kwargs['fields'] = [name.strip() for name in fields.split(',') if name.strip()]
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        key = catalog_cache.make_key('list', catalog_cache.list_scopes(request.query_params), request)
+        # The cache key already encodes the query and the catalog versions it depends on.
+        etag = make_etag(key)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        data = catalog_cache.get_or_build(key, lambda: build(request, *args, **kwargs).data)
+        return set_validators(Response(data), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        pk = kwargs[self.lookup_field]
+        try:
+            stamps = Item.objects.filter(pk=pk).values_list('updated_at', 'seller__updated_at').first()
+        except (TypeError, ValueError):
+            stamps = None
+        if stamps is None:
+            return build(request, *args, **kwargs)
+        last_modified = max(stamp for stamp in stamps if stamp)
+        etag = make_etag('item', pk, *stamps, request.query_params.get('fields', ''))
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        key = catalog_cache.make_key('detail:' + etag.strip('"'), [catalog_cache.item_scope(pk)], request)
+        data = catalog_cache.get_or_build(key, lambda: build(request, *args, **kwargs).data)
+        return set_validators(Response(data), etag, last_modified)
 
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
 
-    @action(detail=True, methods=['post'])
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Query parameter q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        page_size = self.paginator.get_page_size(request)
+
+        hits = search.search(query, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(hits) > page_size
+        hits = hits[:page_size]
+
+        items = self.get_queryset().in_bulk([item_id for item_id, _, _ in hits])
+        hits = [hit for hit in hits if hit[0] in items]
+        results = self.get_serializer([items[item_id] for item_id, _, _ in hits], many=True).data
+        for row, (_, name, snippet) in zip(results, hits):
+            row['highlight'] = {'name': name, 'description': snippet}
+
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Upload a CSV or NDJSON file in the "file" field'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fmt = request.data.get('format') or importer.detect_format(upload.name, upload.content_type or '')
+        if fmt not in importer.FORMATS:
+            return Response(
+                {'error': f'Unsupported format {fmt}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = importer.import_items(upload.file, fmt, request.user)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # ?format= is reserved by DRF for renderer selection, hence ?output=.
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in exporter.FORMATS:
+            return Response(
+                {'error': f'Unsupported format {fmt}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        seller = request.query_params.get('seller')
+        if seller is not None:
+            seller = ParamParsers().parse_int('seller', seller)
+        response = StreamingHttpResponse(
+            exporter.stream(fmt, seller),
+            content_type=exporter.CONTENT_TYPES[fmt]
+        )
+        response['Content-Disposition'] = f'attachment; filename="items.{fmt}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        matches = autocomplete.get_index().lookup(request.query_params.get('prefix', ''), limit=limit)
+        return Response([
+            {'id': item_id, 'name': name, 'category': category}
+            for item_id, name, category in matches
+        ])
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Imported here: similarity loads numpy and torch.
+        from craftify import similarity
+
+        item = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        # Items whose image has not been embedded yet have no neighbours.
+        matches = similarity.similar(item.pk, limit) or []
+        items = self.get_queryset().in_bulk([item_id for item_id, _ in matches])
+        matches = [(item_id, score) for item_id, score in matches if item_id in items]
+        results = self.get_serializer([items[item_id] for item_id, _ in matches], many=True).data
+        for row, (_, score) in zip(results, matches):
+            row['similarity'] = score
+        return Response({'results': results})
+
+    # Any signed-in buyer may add an item; IsSellerOrReadOnly would limit this to its seller.
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_to_cart(self, request, pk=None):
         item = self.get_object()
         cart, _ = Cart.objects.get_or_create(user=request.user)
-        quantity = int(request.data.get('quantity', 1))
-        
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            item=item,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-            
+        try:
+            quantity = int(request.data.get('quantity', 1))
+            cart_item = carts.add_later(cart.pk, item.pk, quantity)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except inventory.InsufficientStock as exc:
+            _, available = exc.shortages[item.pk]
+            return Response(
+                {'error': f'Only {available} of {item.name} available', 'available': available},
+                status=status.HTTP_409_CONFLICT
+            )
+        if cart_item is None:
+            return Response({'status': 'Item will be added to cart', 'item_id': item.pk, 'quantity': quantity},
+                            status=status.HTTP_202_ACCEPTED)
         return Response({'status': 'Item added to cart'})
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -62,7 +214,117 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).with_lines()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Show the user their own written-behind adds (CART_WRITE_BEHIND).
+        if getattr(settings, 'CART_WRITE_BEHIND', 0) and self.action != 'add_to_cart':
+            cart_id = Cart.objects.filter(user=request.user).values_list('pk', flat=True).first()
+            if cart_id is not None:
+                carts.flush(cart_id)
+
+    def get_cart_validators(self, request, **filters):
+        """ETag and Last-Modified for the user's cart from one indexed lookup.
+
+        Cart.version tracks line changes; the newest item and seller stamps
+        cover price or name edits showing through the nested items.
+        """
+        stamps = Cart.objects.filter(user=request.user, **filters).annotate(
+            items_updated=Max('items__item__updated_at'),
+            sellers_updated=Max('items__item__seller__updated_at'),
+        ).values_list(*self.stamp_fields).first()
+        if stamps is None:
+            return None, None
+        return self.validators(stamps)
+
+    stamp_fields = ('pk', 'version', 'updated_at', 'items_updated', 'sellers_updated')
+
+    def validators(self, stamps):
+        last_modified = max(stamp for stamp in stamps[2:] if stamp)
+        return make_etag('cart', *stamps), last_modified
+
+    def conditional(self, request, build, **filters):
+        etag, last_modified = self.get_cart_validators(request, **filters)
+        if etag is None:
+            return build()
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        return set_validators(build(), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return self.conditional(request, lambda: build(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        try:
+            pk = int(kwargs[self.lookup_field])
+        except ValueError:
+            return build(request, *args, **kwargs)
+        return self.conditional(request, lambda: build(request, *args, **kwargs), pk=pk)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Line count, unit count and total for a cart badge, from one aggregate
+        query. ``version`` is the ETag GET /api/cart/ would send, so a client
+        holding a cart with that ETag need not fetch it again.
+        """
+        row = Cart.objects.filter(user=request.user).annotate(
+            items_updated=Max('items__item__updated_at'),
+            sellers_updated=Max('items__item__seller__updated_at'),
+            lines=Count('items'),
+            units=Coalesce(Sum('items__quantity'), 0),
+            total=Coalesce(Sum(line_total('items__')), Value(Decimal('0')), output_field=DecimalField()),
+        ).values(*self.stamp_fields, 'lines', 'units', 'total').first()
+        if row is None:
+            return Response({'lines': 0, 'units': 0, 'total_price': '0.00', 'version': None})
+
+        version, last_modified = self.validators([row[field] for field in self.stamp_fields])
+        etag = make_etag('cart-summary', version)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        return set_validators(Response({
+            'lines': row['lines'],
+            'units': row['units'],
+            'total_price': f"{row['total']:.2f}",
+            'version': version,
+        }), etag, last_modified)
+
+    def update_lines(self, request):
+        """
+        PATCH /api/cart/ with ``[{"item_id": 1, "quantity": 2}, ...]`` (or
+        ``{"items": [...]}``) sets each item's quantity; 0 removes it. The
+        items being set are checked in one query and every change is applied
+        in one transaction, or none is. Responds with the updated cart.
+        """
+        operations = request.data.get('items', []) if isinstance(request.data, dict) else request.data
+        serializer = CartLineSerializer(data=operations, many=True)
+        serializer.is_valid(raise_exception=True)
+        # A later operation on the same item wins.
+        quantities = {operation['item_id']: operation['quantity'] for operation in serializer.validated_data}
+        # Removing a line needs no item, so a deleted item's stale line can still be cleared.
+        added = [item_id for item_id, quantity in quantities.items() if quantity > 0]
+        missing = set(added) - set(Item.objects.filter(pk__in=added).values_list('id', flat=True))
+        if missing:
+            return Response(
+                {'error': 'Items not found', 'item_ids': sorted(missing)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        try:
+            carts.set_quantities(cart.pk, quantities)
+        except inventory.InsufficientStock as exc:
+            return Response(
+                {'error': 'Not enough stock',
+                 'available': {item_id: available for item_id, (_, available) in exc.shortages.items()}},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(self.get_queryset().get(pk=cart.pk)).data)
 
     @action(detail=False, methods=['post'])
     def add_to_cart(self, request, item_id=None):
@@ -70,16 +332,15 @@ class CartViewSet(viewsets.ModelViewSet):
             item = Item.objects.get(id=item_id)
             cart, created = Cart.objects.get_or_create(user=request.user)
             quantity = int(request.data.get('quantity', 1))
-
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                item=item,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                cart_item.quantity += quantity
-                cart_item.save()
+            # The line only changes if its stock can be held for CART_HOLD_TTL.
+            cart_item = carts.add_later(cart.pk, item.pk, quantity)
+            if cart_item is None:
+                return Response({
+                    'message': 'Item will be added to cart',
+                    'item_id': item.pk,
+                    'quantity': quantity,
+                }, status=status.HTTP_202_ACCEPTED)
+            cart_item.item = item
 
             return Response({
                 'message': 'Item added to cart successfully',
@@ -91,6 +352,12 @@ class CartViewSet(viewsets.ModelViewSet):
                 {'error': 'Item not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        except inventory.InsufficientStock as exc:
+            _, available = exc.shortages[item.pk]
+            return Response(
+                {'error': f'Only {available} of {item.name} available', 'available': available},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
@@ -127,16 +394,69 @@ class CartViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class PurchaseOrderViewSet(BaseModelViewSet):
+class PurchaseOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """The buyer's order history. Orders are only placed through POST /api/checkout/."""
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderFilter]
 
     def get_queryset(self):
-        return PurchaseOrder.objects.filter(buyer=self.request.user)
+        # Newest first per buyer walks the (buyer, created_at) index; a page of
+        # orders costs one query for the orders and one for all their items.
+        return PurchaseOrder.objects.filter(buyer=self.request.user).prefetch_related(
+            Prefetch(
+                'items',
+                queryset=PurchaseOrderItem.objects.select_related('item__seller')
+            )
+        )
 
-    def perform_create(self, serializer):
-        serializer.save(buyer=self.request.user)
+class CheckoutView(APIView):
+    """
+    POST /api/checkout/ places the user's cart as one order per seller.
+
+    The body carries the billing, shipping and payment details Checkout.js
+    collects. Payment is simulated and no card details are stored; the
+    response echoes the shipping address and the card's last four digits.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        cart = Cart.objects.filter(user=request.user).first()
+        try:
+            placed = orders.place_orders(cart) if cart is not None else []
+        except inventory.InsufficientStock as exc:
+            names = dict(Item.objects.filter(pk__in=exc.shortages).values_list('id', 'name'))
+            return Response({
+                'error': 'Not enough stock',
+                'shortages': [
+                    {'item_id': item_id, 'name': names.get(item_id), 'requested': requested, 'available': available}
+                    for item_id, (requested, available) in sorted(exc.shortages.items())
+                ],
+            }, status=status.HTTP_409_CONFLICT)
+        if not placed:
+            return Response({'error': 'Your cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def line_data(line):
+            return {'item_id': line.item_id, 'name': line.item.name,
+                    'quantity': line.quantity, 'price': f'{line.price:.2f}'}
+
+        payment = request.data.get('payment') or {}
+        card_number = str(payment.get('cardNumber', '')) if isinstance(payment, dict) else ''
+        return Response({
+            'orders': [{
+                'id': order.id,
+                'seller': order.seller_id,
+                'total_amount': f'{order.total_amount:.2f}',
+                'items': [line_data(line) for line in order.lines],
+            } for order in placed],
+            'items': [line_data(line) for order in placed for line in order.lines],
+            'total_amount': f'{sum(order.total_amount for order in placed):.2f}',
+            'shipping': request.data.get('shipping') or {},
+            'payment': {'last4': card_number[-4:]},
+        }, status=status.HTTP_201_CREATED)
 
 class PurchaseOrderItemViewSet(BaseModelViewSet):
     queryset = PurchaseOrderItem.objects.all()
@@ -146,17 +466,90 @@ class PurchaseOrderItemViewSet(BaseModelViewSet):
     def get_queryset(self):
         return PurchaseOrderItem.objects.filter(
             purchase_order__buyer=self.request.user
-        )
+        ).select_related('item__seller')
 
 class TokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        # The visitor's guest cart (kept in their session) becomes theirs.
+        guest_carts.merge(request, serializer.user)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+class GuestCartView(APIView):
+    """
+    Cart for visitors who are not signed in, kept in the cache under their
+    session instead of the database:
+
+        GET                                          the cart, shaped like /api/cart/
+        POST  {"item_id": 1, "quantity": 2}          add to an item's quantity
+        PATCH [{"item_id": 1, "quantity": 0}, ...]   set quantities; 0 removes
+
+    Guest lines hold no stock. They are merged into the user's cart on login.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return self.render(request, guest_carts.lines(request))
+
+    def post(self, request):
+        serializer = CartLineSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_id, quantity = serializer.validated_data['item_id'], serializer.validated_data['quantity']
+        if not Item.objects.filter(pk=item_id).exists():
+            return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            quantities = guest_carts.add(request, item_id, quantity)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.render(request, quantities)
+
+    def patch(self, request):
+        operations = request.data.get('items', []) if isinstance(request.data, dict) else request.data
+        serializer = CartLineSerializer(data=operations, many=True)
+        serializer.is_valid(raise_exception=True)
+        quantities = {operation['item_id']: operation['quantity'] for operation in serializer.validated_data}
+        # Removing a line needs no item, so a deleted item's stale line can still be cleared.
+        added = [item_id for item_id, quantity in quantities.items() if quantity > 0]
+        missing = set(added) - set(Item.objects.filter(pk__in=added).values_list('id', flat=True))
+        if missing:
+            return Response(
+                {'error': 'Items not found', 'item_ids': sorted(missing)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.render(request, guest_carts.set_quantities(request, quantities))
+
+    def render(self, request, quantities):
+        items = Item.objects.select_related('seller').in_bulk(quantities)
+        lines = [CartItem(item=items[item_id], quantity=quantity)
+                 for item_id, quantity in quantities.items() if item_id in items]
+        total = sum((line.get_total_price() for line in lines), Decimal('0'))
+        return Response({
+            'items': CartItemSerializer(lines, many=True, context={'request': request}).data,
+            'total_price': f'{total:.2f}',
+        })
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     lookup_field = 'id'
 
+    def retrieve(self, request, *args, **kwargs):
+        updated_at = User.objects.filter(id=kwargs[self.lookup_field]).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag = make_etag('user', kwargs[self.lookup_field], updated_at)
+        unchanged = not_modified(request, etag, updated_at)
+        if unchanged is not None:
+            return unchanged
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, updated_at)
+
 class SignupView(APIView):
     permission_classes = [AllowAny]
     
@@ -1,17 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from craftify.models.cart_controller import Cart, CartItem
-from craftify.models.item_controller import Item, PurchaseOrder, PurchaseOrderItem
+from craftify.models.item_controller import Item
 from craftify.forms.cart_form import AddToCartForm, CartUpdateForm, CartRemoveForm
 from django.contrib import messages
+from craftify import inventory, carts, orders
 
 @login_required
 def view_cart(request):
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.all()
+    carts.flush(cart.pk)
+    cart_items = list(cart.items.with_totals().select_related('item__seller'))
     context = {
         'cart': cart,
         'cart_items': cart_items,
+        'total_price': sum(cart_item.line_total for cart_item in cart_items),
     }
     return render(request, 'cart.html', context)
 
@@ -25,15 +28,12 @@ def add_to_cart(request, item_id):
         form = AddToCartForm(request.POST)
         if form.is_valid():
             quantity = form.cleaned_data['quantity']
-            cart_item, item_created = CartItem.objects.get_or_create(
-                cart=cart,
-                item=item
-            )
-            if item_created:
-                cart_item.quantity = quantity
-            else:
-                cart_item.quantity += quantity
-            cart_item.save()
+            try:
+                carts.add(cart.pk, item.pk, quantity)
+            except inventory.InsufficientStock as exc:
+                requested, available = exc.shortages[item.pk]
+                messages.error(request, f"Only {available} of {item.name} left; you asked for {requested}.")
+                return redirect('cart')
             messages.success(request, f"Added {quantity} of {item.name} to your cart.")
             return redirect('cart')
         else:
@@ -62,6 +62,7 @@ def remove_from_cart(request, item_id):
 @login_required
 def checkout(request):
     cart = get_object_or_404(Cart, user=request.user)
+    carts.flush(cart.pk)
     if not cart.items.exists():
         messages.error(request, "Your cart is empty.")
         return redirect('cart')
@@ -69,23 +70,17 @@ def checkout(request):
         # Simulate payment process
         confirm_payment = True  # In reality, integrate with a payment gateway
         if confirm_payment:
-            # Wrap order creation in a transaction for data integrity
-            with transaction.atomic():
-                # Assuming all items in the cart have the same seller; adjust if needed
-                seller = cart.items.first().item.seller
-                purchase_order = PurchaseOrder.objects.create(
-                    buyer=request.user,
-                    seller=seller,
-                    total_amount=cart.get_total_price()
-                )
-                for cart_item in cart.items.all():
-                    PurchaseOrderItem.objects.create(
-                        purchase_order=purchase_order,
-                        item=cart_item.item,
-                        quantity=cart_item.quantity,
-                        price=cart_item.item.price
+            # One order per seller, created in a single transaction
+            try:
+                orders.place_orders(cart)
+            except inventory.InsufficientStock as exc:
+                names = dict(Item.objects.filter(pk__in=exc.shortages).values_list('id', 'name'))
+                for item_id, (requested, available) in exc.shortages.items():
+                    messages.error(
+                        request,
+                        f"Only {available} of {names[item_id]} left; you asked for {requested}."
                     )
-                cart.items.all().delete()
+                return redirect('cart')
             messages.success(request, "Checkout successful. Your order has been placed.")
             return redirect('home')
         else: